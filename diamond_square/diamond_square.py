@@ -1,5 +1,10 @@
+import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from png_writer import write_png
 
 # Create a cloud-like image based on noise generated by the "diamond-square"
 # algorithm. The maths behind this code is described in the scipython blog
@@ -7,59 +12,236 @@ import matplotlib.pyplot as plt
 # https://scipython.com/blog/cloud-images-using-the-diamond-square-algorithm/
 # Christian Hill, March 2016.
 
-DPI = 100
-
-# The array must be square with edge length 2**n + 1
-n = 10
-N = 2**n + 1
-# f scales the random numbers at each stage of the algorithm
-f = 1.0
-
-# Initialise the array with random numbers at its corners
-arr = np.zeros((N, N))
-arr[0::N-1,0::N-1] = np.random.uniform(-1, 1, (2,2))
-side = N-1
-
-nsquares = 1
-while side > 1:
-    sideo2 = side // 2
-
-    # Diamond step
-    for ix in range(nsquares):
-        for iy in range(nsquares):
-            x0, x1, y0, y1 = ix*side, (ix+1)*side, iy*side, (iy+1)*side
-            xc, yc = x0 + sideo2, y0 + sideo2
-            # Set this pixel to the mean of its "diamond" neighbours plus
-            # a random offset.
-            arr[yc,xc] = (arr[y0,x0] + arr[y0,x1] + arr[y1,x0] + arr[y1,x1])/4
-            arr[yc,xc] += f * np.random.uniform(-1,1)
-
-    # Square step: NB don't do this step until the pixels from the preceding
-    # diamond step have been set.
-    for iy in range(2*nsquares+1):
-        yc = sideo2 * iy
-        for ix in range(nsquares+1):
-            xc = side * ix + sideo2 * (1 - iy % 2)
-            if not (0 <= xc < N and 0 <= yc < N):
-                continue
-            tot, ntot = 0., 0
-            # Set this pixel to the mean of its "square" neighbours plus
-            # a random offset. At the edges, it has only three neighbours
-            for (dx, dy) in ((-1,0), (1,0), (0,-1), (0,1)):
-                xs, ys = xc + dx*sideo2, yc + dy*sideo2
-                if not (0 <= xs < N and 0 <= ys < N):
-                    continue
-                else:
-                    tot += arr[ys, xs]
-                    ntot += 1
-            arr[yc, xc] += tot / ntot + f * np.random.uniform(-1,1)
-    side = sideo2
-    nsquares *= 2
-    f /= 2
-
-fig = plt.figure(figsize=(N/DPI, N/DPI), dpi=DPI)
-plt.imshow(arr, cmap=plt.cm.terrain, interpolation='bicubic')
-plt.axis('off')
-
-plt.savefig('terrain.png', dpi=DPI)
-plt.show()
+# The colours of matplotlib's "terrain" colour map, interpolated linearly
+# between these fractions of the height range.
+TERRAIN = ((0.00, (0.2, 0.2, 0.6)),
+           (0.15, (0.0, 0.6, 1.0)),
+           (0.25, (0.0, 0.8, 0.4)),
+           (0.50, (1.0, 1.0, 0.6)),
+           (0.75, (0.5, 0.36, 0.33)),
+           (1.00, (1.0, 1.0, 1.0)))
+
+# Each step below sets one kind of point for a band of rows of squares
+# i0 <= i < i1 (by default, all of them), in place on strided views of the
+# array, so the only temporary arrays are the offsets for the band.
+
+def diamond_step(arr, side, offsets, i0=0, i1=None):
+    """Set the centre of each square of the given side in arr.
+
+    Each centre is set to the mean of the square's four corners, plus its
+    random offset from the array offsets.
+
+    """
+
+    h = side // 2
+    centres = arr[h::side, h::side][i0:i1]
+    corners = arr[::side, ::side]
+    above, below = corners[:-1][i0:i1], corners[1:][i0:i1]
+    np.add(above[:, :-1], above[:, 1:], out=centres)
+    centres += below[:, :-1]
+    centres += below[:, 1:]
+    centres /= 4
+    centres += offsets
+
+def row_midpoints(arr, side, offsets, i0=0, i1=None, seamless=False):
+    """Set the midpoint of each horizontal edge of the squares in arr.
+
+    Each midpoint is set to the mean of its "square" neighbours: the two
+    corners at either end of its edge and the centres of the squares above
+    and below it, plus its random offset from the array offsets. In the
+    first and last rows of the array, it has only three neighbours; if
+    seamless is True, only the two corners along the array's edge are used,
+    so that the values along the edge don't depend on the rest of the
+    array. Here, i0 and i1 index the rows of corners, 0 to m for m rows of
+    squares.
+
+    """
+
+    h = side // 2
+    centres = arr[h::side, h::side]
+    m = centres.shape[0]
+    i1 = m + 1 if i1 is None else i1
+    corners = arr[::side, ::side][i0:i1]
+    mid = arr[::side, h::side][i0:i1]
+    np.add(corners[:, :-1], corners[:, 1:], out=mid)
+    a, b = max(i0, 1), min(i1, m)
+    if a < b:
+        inner = mid[a-i0:b-i0]
+        inner += centres[a-1:b-1]
+        inner += centres[a:b]
+        inner /= 4
+    nedge = 2 if seamless else 3
+    if i0 == 0:
+        if not seamless:
+            mid[0] += centres[0]
+        mid[0] /= nedge
+    if i1 == m + 1:
+        if not seamless:
+            mid[-1] += centres[-1]
+        mid[-1] /= nedge
+    mid += offsets
+
+def column_midpoints(arr, side, offsets, i0=0, i1=None, seamless=False):
+    """Set the midpoint of each vertical edge of the squares in arr.
+
+    As for row_midpoints, but the square centres are to the left and right
+    of each midpoint, the first and last columns of the array are its
+    edges, and i0 and i1 index the rows of squares.
+
+    """
+
+    h = side // 2
+    centres = arr[h::side, h::side][i0:i1]
+    corners = arr[::side, ::side]
+    mid = arr[h::side, ::side][i0:i1]
+    np.add(corners[:-1][i0:i1], corners[1:][i0:i1], out=mid)
+    inner = mid[:, 1:-1]
+    inner += centres[:, :-1]
+    inner += centres[:, 1:]
+    inner /= 4
+    if not seamless:
+        mid[:, 0] += centres[:, 0]
+        mid[:, -1] += centres[:, -1]
+    mid[:, ::mid.shape[1]-1] /= 2 if seamless else 3
+    mid += offsets
+
+def square_step(arr, side, row_offsets, column_offsets, seamless=False):
+    """Set the midpoint of each edge of the squares of the given side in arr.
+
+    The midpoints of the horizontal edges are offset by row_offsets and
+    those of the vertical edges by column_offsets (see row_midpoints and
+    column_midpoints). NB this step must follow the diamond step for the
+    same side.
+
+    """
+
+    row_midpoints(arr, side, row_offsets, seamless=seamless)
+    column_midpoints(arr, side, column_offsets, seamless=seamless)
+
+def diamond_square(n, f=1.0, rng=None, dtype=np.float64, out=None,
+                   band=None):
+    """Return a (2**n + 1) x (2**n + 1) array of diamond-square noise.
+
+    f scales the random numbers at the first level of the algorithm, and is
+    halved at each subsequent level. Each level's diamond and square steps
+    are carried out on strided views of the array, in bands of at most band
+    rows (by default, the whole array at once), with the random offsets for
+    each band drawn in a single call for each kind of point. The random
+    numbers are drawn in the same order whatever the band, so the noise
+    depends only on rng.
+
+    The noise is written to out, if given; otherwise, to a new array of the
+    type dtype. For the largest arrays, out can be a float32 numpy.memmap
+    (see heightmap_memmap) and band a few thousand rows, so that only a
+    band of the array needs to be held in memory at once.
+
+    """
+
+    rng = np.random.default_rng(rng)
+    N = 2**n + 1
+    arr = np.zeros((N, N), dtype=dtype) if out is None else out
+    # Initialise the array with random numbers at its corners
+    arr[0::N-1,0::N-1] = rng.uniform(-1, 1, (2,2))
+    side = N-1
+    m = 1
+    while side > 1:
+        # The number of rows of squares in each band.
+        nb = m if band is None else max(1, band // side)
+        for i0 in range(0, m, nb):
+            i1 = min(i0 + nb, m)
+            diamond_step(arr, side, f * rng.uniform(-1, 1, (i1-i0, m)),
+                         i0, i1)
+        for i0 in range(0, m+1, nb):
+            i1 = min(i0 + nb, m+1)
+            row_midpoints(arr, side, f * rng.uniform(-1, 1, (i1-i0, m)),
+                          i0, i1)
+        for i0 in range(0, m, nb):
+            i1 = min(i0 + nb, m)
+            column_midpoints(arr, side, f * rng.uniform(-1, 1, (i1-i0, m+1)),
+                             i0, i1)
+        side //= 2
+        m *= 2
+        f /= 2
+    return arr
+
+def heightmap_memmap(filename, n, dtype=np.float32):
+    """Return a new (2**n + 1) x (2**n + 1) array memory-mapped to filename."""
+
+    N = 2**n + 1
+    return np.memmap(filename, dtype=dtype, mode='w+', shape=(N, N))
+
+def _bands(arr, band):
+    """Yield copies of the bands of at most band rows of arr, as float64."""
+
+    for i in range(0, arr.shape[0], band):
+        yield np.array(arr[i:i+band], dtype=np.float64)
+
+def height_range(arr, band=1024):
+    """Return the minimum and maximum of arr, reading band rows at a time."""
+
+    lo, hi = np.inf, -np.inf
+    for rows in _bands(arr, band):
+        lo, hi = min(lo, rows.min()), max(hi, rows.max())
+    return lo, hi
+
+def write_raw16(arr, filename, band=1024):
+    """Write arr as a raw heightmap of little-endian 16-bit unsigned integers.
+
+    The heights are scaled so that their range fills 0-65535, and written
+    band rows at a time, with no header.
+
+    """
+
+    lo, hi = height_range(arr, band)
+    scale = 65535 / (hi - lo) if hi > lo else 0
+    with open(filename, 'wb') as fo:
+        for rows in _bands(arr, band):
+            rows -= lo
+            rows *= scale
+            np.rint(rows).astype('<u2').tofile(fo)
+
+def terrain_lut(ncolours=256):
+    """Return the (ncolours, 3) uint8 lookup table of terrain colours."""
+
+    x, colours = zip(*TERRAIN)
+    t = np.linspace(0, 1, ncolours)
+    rgb = np.array([np.interp(t, x, c) for c in zip(*colours)]).T
+    return np.rint(rgb * 255).astype(np.uint8)
+
+def write_terrain_png(arr, filename, band=1024, lut=None):
+    """Write arr as a PNG image in terrain colours.
+
+    Each height is coloured from the lookup table lut (by default, that of
+    terrain_lut) according to its fraction of the height range; the image
+    is written band rows at a time, one pixel per point.
+
+    """
+
+    if lut is None:
+        lut = terrain_lut()
+    lo, hi = height_range(arr, band)
+    scale = (len(lut) - 1) / (hi - lo) if hi > lo else 0
+
+    def stripes():
+        for rows in _bands(arr, band):
+            rows -= lo
+            rows *= scale
+            yield lut[np.rint(rows).astype(np.intp)]
+
+    write_png(filename, arr.shape[1], arr.shape[0], stripes())
+
+if __name__ == '__main__':
+    # The array must be square with edge length 2**n + 1; n may be given on
+    # the command line. Large arrays are generated in float32 in a memory-
+    # mapped file, terrain.f32, a band of rows at a time.
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    # f scales the random numbers at each stage of the algorithm
+    f = 1.0
+    if n > 12:
+        arr = diamond_square(n, f, out=heightmap_memmap('terrain.f32', n),
+                             band=4096)
+    else:
+        arr = diamond_square(n, f)
+
+    write_raw16(arr, 'terrain.r16')
+    write_terrain_png(arr, 'terrain.png')
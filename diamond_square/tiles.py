@@ -0,0 +1,135 @@
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from diamond_square import diamond_step, square_step
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from hashed_random import hashed_uniform
+
+# Generate an unbounded diamond-square terrain as a grid of square tiles of
+# (2**n + 1) x (2**n + 1) points, each sharing its edges with its neighbours.
+# Rather than being drawn from a random number generator, the random offset
+# at each point is hashed from the seed, the level of the algorithm at which
+# the point is set and the point's global coordinates, so any tile can be
+# generated independently, in parallel and in any order. The points along a
+# tile's edges are set from the two neighbouring points along the edge only
+# (see square_step), so they are the same for the tiles on either side of
+# the edge and the terrain is seamless.
+
+def offsets(seed, level, X, Y, f):
+    """Return the random offsets in [-f, f) for the points (X, Y)."""
+
+    return f * (2 * hashed_uniform(seed, level, X, Y) - 1)
+
+def make_tile(tx, ty, n=8, seed=0, f=1.0):
+    """Return the terrain tile at tile coordinates (tx, ty).
+
+    The tile covers the points with global coordinates X = tx * 2**n, ...,
+    (tx+1) * 2**n and Y = ty * 2**n, ..., (ty+1) * 2**n. f scales the random
+    offsets at the tile corners, and is halved at each level of the
+    algorithm, as for diamond_square.
+
+    """
+
+    N = 2**n + 1
+    X0, Y0 = tx * 2**n, ty * 2**n
+    arr = np.zeros((N, N))
+    corners = np.array([0, N-1])
+    arr[0::N-1, 0::N-1] = offsets(seed, 0, X0 + corners[None, :],
+                                  Y0 + corners[:, None], f)
+    side, level = N-1, 1
+    while side > 1:
+        h = side // 2
+        # The global coordinates of the points set at this level: a is
+        # 0, side, 2*side, ... and b is h, h + side, ... within the tile.
+        a = np.arange(0, N, side)
+        b = a[:-1] + h
+        diamond_step(arr, side, offsets(seed, level, X0 + b[None, :],
+                                        Y0 + b[:, None], f))
+        square_step(arr, side,
+                    offsets(seed, level, X0 + b[None, :], Y0 + a[:, None], f),
+                    offsets(seed, level, X0 + a[None, :], Y0 + b[:, None], f),
+                    seamless=True)
+        side //= 2
+        level += 1
+        f /= 2
+    return arr
+
+class Terrain:
+    """A seamless, unbounded diamond-square terrain, generated in tiles.
+
+    The most recently used cache_size tiles are kept in an LRU cache, so
+    that a map viewer panning across the terrain only generates the tiles
+    that come into view. The cached tiles are read-only.
+
+    """
+
+    def __init__(self, n=8, seed=0, f=1.0, cache_size=256):
+        self.n, self.seed, self.f = n, seed, f
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def _add(self, key, arr):
+        arr.flags.writeable = False
+        self.cache[key] = arr
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return arr
+
+    def tile(self, tx, ty):
+        """Return the tile at tile coordinates (tx, ty)."""
+
+        try:
+            self.cache.move_to_end((tx, ty))
+            return self.cache[tx, ty]
+        except KeyError:
+            return self._add((tx, ty),
+                             make_tile(tx, ty, self.n, self.seed, self.f))
+
+    def prefetch(self, tiles, max_workers=None):
+        """Generate the tiles, a sequence of (tx, ty), in parallel.
+
+        The tiles not already in the cache are generated by a pool of
+        max_workers processes and added to it.
+
+        """
+
+        tiles = [key for key in dict.fromkeys(tiles) if key not in self.cache]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(make_tile, tx, ty, self.n, self.seed,
+                                       self.f) for tx, ty in tiles]
+            for key, future in zip(tiles, futures):
+                self._add(key, future.result())
+
+    def region(self, X0, Y0, width, height):
+        """Return the heights at global coordinates X0 <= X < X0 + width,
+        Y0 <= Y < Y0 + height, assembled from the tiles which cover them.
+
+        """
+
+        T = 2**self.n
+        out = np.empty((height, width))
+        for ty in range(Y0 // T, (Y0 + height - 1) // T + 1):
+            for tx in range(X0 // T, (X0 + width - 1) // T + 1):
+                tile = self.tile(tx, ty)
+                # The part of the region covered by this tile.
+                x0, x1 = max(X0, tx * T), min(X0 + width, (tx+1) * T + 1)
+                y0, y1 = max(Y0, ty * T), min(Y0 + height, (ty+1) * T + 1)
+                out[y0-Y0:y1-Y0, x0-X0:x1-X0] = tile[y0 - ty*T:y1 - ty*T,
+                                                     x0 - tx*T:x1 - tx*T]
+        return out
+
+if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
+    # Two by two tiles around the origin, generated in parallel.
+    terrain = Terrain(n=9)
+    terrain.prefetch([(tx, ty) for ty in (-1, 0) for tx in (-1, 0)])
+    arr = terrain.region(-512, -512, 1024, 1024)
+    plt.imshow(arr, cmap=plt.cm.terrain)
+    plt.axis('off')
+    plt.show()
@@ -1,52 +1,260 @@
+import os
+import zipfile
+from functools import lru_cache
 import numpy as np
-from scipy.optimize import brentq
 
 def intersection_area(d, R, r):
     """Return the area of intersection of two circles.
 
     The circles have radii R and r, and their centres are separated by d.
+    d, R and r may be arrays, which are broadcast against each other.
 
     """
 
-    if d <= abs(R-r):
-        # One circle is entirely enclosed in the other.
-        return np.pi * min(R, r)**2
-    if d >= r + R:
-        # The circles don't overlap at all.
-        return 0
+    d, R, r = np.broadcast_arrays(*(np.asarray(x, dtype=float)
+                                    for x in (d, R, r)))
+    A = np.zeros(d.shape)
+
+    # One circle is entirely enclosed in the other.
+    enclosed = d <= abs(R-r)
+    A[enclosed] = np.pi * np.minimum(R, r)[enclosed]**2
+    # Otherwise, unless the circles don't overlap at all (d >= r + R), the
+    # overlap is made up of two circular segments.
+    lens = ~enclosed & (d < r + R)
+    d, R, r = d[lens], R[lens], r[lens]
 
     r2, R2, d2 = r**2, R**2, d**2
-    alpha = np.arccos((d2 + r2 - R2) / (2*d*r))
-    beta = np.arccos((d2 + R2 - r2) / (2*d*R))
-    return ( r2 * alpha + R2 * beta -
-             0.5 * (r2 * np.sin(2*alpha) + R2 * np.sin(2*beta))
-           )
+    # Clip the cosines, which can stray just outside [-1, 1] by rounding.
+    # The difference of the squared radii is taken first, so that d2 isn't
+    # lost to cancellation when the radii are (nearly) equal and d is small.
+    dr2 = (r - R) * (r + R)
+    alpha = np.arccos(np.clip((d2 + dr2) / (2*d*r), -1, 1))
+    beta = np.arccos(np.clip((d2 - dr2) / (2*d*R), -1, 1))
+    A[lens] = ( r2 * alpha + R2 * beta -
+                0.5 * (r2 * np.sin(2*alpha) + R2 * np.sin(2*beta))
+              )
+    return A[()]
+
+def chord_length(d, R, r):
+    """Return the length of the common chord of two overlapping circles.
+
+    This is minus the derivative of their intersection area with respect to
+    d, for abs(R-r) < d < R+r.
+
+    """
 
-def find_d(A, R, r):
+    s = (-d + r + R) * (d + r - R) * (d - r + R) * (d + r + R)
+    return np.sqrt(np.maximum(s, 0)) / d
+
+def find_d(A, R, r, tol=1e-12, maxiter=100):
     """
     Find the distance between the centres of two circles giving overlap area A.
 
+    A, R and r may be arrays, which are broadcast against each other, and
+    all the distances are found at once by Newton's method, safeguarded by
+    bisection: each d is kept within an interval bracketing its root, and a
+    Newton step that would leave it is replaced by bisecting the interval.
+
     """
 
+    A, R, r = np.broadcast_arrays(*(np.asarray(x, dtype=float)
+                                    for x in (A, R, r)))
     # A cannot be larger than the area of the smallest circle!
-    if A > np.pi * min(r, R)**2:
+    Amax = np.pi * np.minimum(r, R)**2
+    if np.any(A > Amax):
         raise ValueError("Intersection area can't be larger than the area"
                          " of the smallest circle")
-    if A == 0:
-        # If the circles don't overlap, place them next to each other
-        return R+r
+    if np.any(A < 0):
+        raise ValueError('Negative intersection area')
+
+    # The intersection area decreases from Amax at d = a to 0 at d = b. If
+    # the circles don't overlap, place them next to each other.
+    a, b = abs(R-r), R+r
+    d = np.where(A == 0, b, np.where(A == Amax, a, np.nan))
+    i = np.flatnonzero(np.isnan(d))
+    A, a, b, R, r, Amax = (x.ravel()[i] for x in (A, a, b, R, r, Amax))
+    # Start from a linear interpolation between the ends of the interval.
+    x = b - A / Amax * (b - a)
+    lo, hi = a, b
+    for _ in range(maxiter):
+        if not len(i):
+            break
+        f = intersection_area(x, R, r) - A
+        # Shrink the bracketing intervals (the area decreases with d).
+        lo, hi = np.where(f > 0, x, lo), np.where(f > 0, hi, x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xnew = x + f / chord_length(x, R, r)
+        bisect = ~((xnew > lo) & (xnew < hi))
+        xnew[bisect] = 0.5 * (lo + hi)[bisect]
+        # Near full overlap, f is only rounding noise of the order of
+        # eps * Amax, and the Newton steps wander within the bracket: stop
+        # once f is that small or the bracket is narrower than the tolerance.
+        found = abs(f) <= 4 * np.finfo(float).eps * Amax
+        xnew[found] = x[found]
+        scale = tol * np.maximum(1, abs(x))
+        converged = (abs(xnew - x) <= scale) | (hi - lo <= scale)
+        d.flat[i[converged]] = xnew[converged]
+        keep = ~converged
+        i, x, lo, hi, A, R, r, Amax = (y[keep] for y in (i, xnew, lo, hi, A,
+                                                         R, r, Amax))
+    if len(i):
+        raise RuntimeError(f'find_d failed to converge in {maxiter} iterations')
+    return d[()]
+
+# Up to scale, the overlap of two circles depends only on the ratio of their
+# radii, so find_d can also be answered from a precomputed table. Scaling
+# the smaller radius to 1 and writing rho >= 1 for the ratio of the radii,
+# the table holds the normalized distance t = (d - (rho-1)) / 2, which runs
+# from 0 (one circle enclosed by the other) to 1 (the circles touching), on
+# a grid of coordinates (v, w) in [0, 1] x [0, 1]. v is a function of the
+# normalized area a = A / pi: a = k / (1+k) with k = (v / (1-v))**1.5,
+# which removes the infinite slope of t(a) at a = 0 and a = 1 (where a
+# varies as a power 3/2 of the distance). w is a function of the inverse
+# ratio u = 1/rho: u = 1 - (1-w)**2, which puts more grid points near equal
+# radii, where t varies fastest with u; u = 0 is the limit of a circle
+# overlapping a half-plane.
+
+def _area_from_v(v):
+    """Return the normalized area a corresponding to table coordinate v."""
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = (v / (1 - v))**1.5
+        return np.where(v < 1, k / (1 + k), 1.)
+
+def _v_from_area(a):
+    """Return the table coordinate v for the normalized area a."""
+
+    p, q = a**(2/3), (1 - a)**(2/3)
+    return p / (p + q)
+
+def normalized_distances(v, w):
+    """Return the normalized distance t at table coordinates (v, w)."""
+
+    v, w = np.broadcast_arrays(v, w)
+    a, u = _area_from_v(v), 1 - (1 - w)**2
+    t = np.empty(v.shape)
+    half_plane = u == 0
+    rho = 1 / u[~half_plane]
+    t[~half_plane] = (find_d(np.pi * a[~half_plane], rho, 1) - (rho - 1)) / 2
+    # For a circle of unit radius whose centre is a distance x = 2t - 1 from
+    # the edge of the half-plane, pi.a = arccos(x) - x.sqrt(1 - x^2), which is
+    # inverted by bisection.
+    a = a[half_plane]
+    lo, hi = np.zeros(a.shape), np.ones(a.shape)
+    for _ in range(60):
+        x = lo + hi - 1
+        larger = np.arccos(x) - x * np.sqrt(1 - x**2) > np.pi * a
+        lo, hi = np.where(larger, (lo + hi) / 2, lo), np.where(larger, hi,
+                                                             (lo + hi) / 2)
+    t[half_plane] = (lo + hi) / 2
+    return t
+
+def build_table(nv=1025, nw=257):
+    """Return the (nv, nw) table of normalized distances and its error.
+
+    The table is interpolated bilinearly, which is monotonic in the area
+    between the grid points. The error returned is an estimated bound on
+    the error in t of the interpolated values, not a guaranteed one: twice
+    the largest error found at the centres and edge midpoints of the grid
+    cells, where the error of bilinear interpolation of a smooth function
+    peaks.
 
-    if A < 0:
+    """
+
+    v, w = np.linspace(0, 1, nv), np.linspace(0, 1, nw)
+    T = normalized_distances(v[:, None], w[None, :])
+    vm, wm = (v[:-1] + v[1:]) / 2, (w[:-1] + w[1:]) / 2
+    errors = [abs(normalized_distances(vm[:, None], wm[None, :])
+                  - (T[:-1, :-1] + T[1:, :-1] + T[:-1, 1:] + T[1:, 1:]) / 4),
+              abs(normalized_distances(vm[:, None], w[None, :])
+                  - (T[:-1] + T[1:]) / 2),
+              abs(normalized_distances(v[:, None], wm[None, :])
+                  - (T[:, :-1] + T[:, 1:]) / 2)]
+    return T, 2 * max(e.max() for e in errors)
+
+# The version of the table's construction, stored with each cached table:
+# increase it whenever a change to the code alters the table's values (as
+# the correction to intersection_area for nearly equal radii did), so that
+# tables cached by earlier versions are rebuilt.
+TABLE_VERSION = 2
+
+@lru_cache
+def load_table(nv=1025, nw=257, cache_dir=None):
+    """Return the table of normalized distances and its error.
+
+    The table is built once and cached in the file
+    circle-overlap-table-{nv}x{nw}.npz in cache_dir (by default, the
+    directory of this module), from which it is loaded thereafter. A cached
+    table which can't be read, or was built by a different TABLE_VERSION,
+    is rebuilt.
+
+    """
+
+    if cache_dir is None:
+        cache_dir = os.path.dirname(os.path.abspath(__file__))
+    filename = os.path.join(cache_dir, f'circle-overlap-table-{nv}x{nw}.npz')
+    try:
+        with np.load(filename) as data:
+            if (int(data['version']) == TABLE_VERSION
+                    and data['T'].shape == (nv, nw)):
+                return data['T'], float(data['error'])
+    except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+        pass
+    T, error = build_table(nv, nw)
+    try:
+        np.savez(filename, T=T, error=error, version=TABLE_VERSION)
+    except OSError:
+        # The cache directory isn't writable: just keep the table in memory.
+        pass
+    return T, error
+
+def find_d_table(A, R, r, polish=False, table=None):
+    """
+    Find the distance between the centres of two circles giving overlap area A.
+
+    As for find_d, but the distance is interpolated from a precomputed table
+    of normalized distances (by default, that returned by load_table), with
+    the same checks on A. The error in the distance is expected to be at
+    most 2 * min(R, r) * error, where error is the table's estimated error
+    bound (see build_table); if polish is True, a single Newton step is
+    taken from the interpolated distance, which reduces the error to
+    roughly its square.
+
+    """
+
+    A, R, r = np.broadcast_arrays(*(np.asarray(x, dtype=float)
+                                    for x in (A, R, r)))
+    T, _ = load_table() if table is None else table
+    nv, nw = T.shape
+    s = np.minimum(R, r)
+    Amax = np.pi * s**2
+    if np.any(A > Amax):
+        raise ValueError("Intersection area can't be larger than the area"
+                         " of the smallest circle")
+    if np.any(A < 0):
         raise ValueError('Negative intersection area')
+    rho = np.maximum(R, r) / s
 
-    def f(d, A, R, r):
-        return intersection_area(d, R, r) - A
+    # Bilinear interpolation in the table.
+    v = _v_from_area(A / Amax) * (nv - 1)
+    w = (1 - np.sqrt(1 - 1 / rho)) * (nw - 1)
+    i = np.minimum(v.astype(int), nv - 2)
+    j = np.minimum(w.astype(int), nw - 2)
+    fv, fw = v - i, w - j
+    t = ((1 - fv) * ((1 - fw) * T[i, j] + fw * T[i, j+1])
+         + fv * ((1 - fw) * T[i+1, j] + fw * T[i+1, j+1]))
+    d = s * (rho - 1 + 2 * t)
 
-    a, b = abs(R-r), R+r
-    d = brentq(f, a, b, args=(A, R, r))
-    return d
+    if polish:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dnew = d + (intersection_area(d, R, r) - A) / chord_length(d, R, r)
+        # Keep the interpolated distance where the Newton step fails.
+        ok = (dnew >= abs(R - r)) & (dnew <= R + r)
+        d = np.where(ok, dnew, d)
+    return d[()]
 
-r, R = 0.5, 1.5
-A = np.pi * r**2
-print(intersection_area(1, R, r) / A)
-print(intersection_area(np.sqrt(2), R, r) / A)
+if __name__ == '__main__':
+    r, R = 0.5, 1.5
+    A = np.pi * r**2
+    print(intersection_area(1, R, r) / A)
+    print(intersection_area(np.sqrt(2), R, r) / A)
@@ -0,0 +1,139 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from sparse_forest import SparseForest, random_forest
+
+# Measure the distribution of fire sizes in the forest-fire model, which
+# follows a power law in its self-organized critical state. Each burning cell
+# is labelled with the fire it belongs to: a tree set alight by a burning
+# neighbour joins that neighbour's fire, fires which meet are merged, and
+# lightning starts a new fire. A fire's size is the total number of cells it
+# has burnt, which is added to a histogram when it goes out. Ensembles of
+# independently seeded runs can be executed in a pool of processes and their
+# histograms combined.
+
+def _merge(parent, a, b):
+    """Merge the sets containing a[k] and b[k], for all k, in place.
+
+    parent is an array union-find structure which must be flat (every entry
+    pointing directly to its root) on entry and is left flat. Each pass
+    points the larger root of each pair at the smaller, then flattens the
+    structure again by pointer jumping, until all the pairs are merged.
+
+    """
+
+    while True:
+        ra, rb = parent[a], parent[b]
+        unmerged = ra != rb
+        if not unmerged.any():
+            return
+        ra, rb = ra[unmerged], rb[unmerged]
+        np.minimum.at(parent, np.maximum(ra, rb), np.minimum(ra, rb))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent[:] = grandparent
+
+class FireClusters(SparseForest):
+    """A SparseForest which labels its fires and records their sizes.
+
+    The labels of the burning cells are the indexes 0, 1, ... of the fires
+    still burning, and the total number of cells burnt by each of these so
+    far is held in the array size; the memory needed is proportional to the
+    number of burning cells. Once a fire has gone out, its size is counted
+    in the Counter histogram (if record is True). Each initially burning
+    cell starts a fire of its own.
+
+    """
+
+    def __init__(self, X, p=0.05, f=0.0001, rng=None):
+        super().__init__(X, p, f, rng)
+        self.labels = np.arange(len(self.burning))
+        self.size = np.ones(len(self.burning), dtype=np.int64)
+        self.histogram = Counter()
+        self.record = True
+
+    def step(self):
+        labels, size = self.labels, self.size
+        nstrikes = super().step()
+        sources, targets = self.spread
+        nfires = len(size)
+
+        # Fires spreading to the same tree are merged.
+        parent = np.arange(nfires)
+        source_labels = labels[sources]
+        order = np.argsort(targets, kind='stable')
+        t, l = targets[order], source_labels[order]
+        same = t[1:] == t[:-1]
+        _merge(parent, l[1:][same], l[:-1][same])
+
+        # Label the new burning cells with the roots of the fires which set
+        # them alight, or new labels for those struck by lightning.
+        new_labels = np.full(len(self.burning), -1)
+        new_labels[np.searchsorted(self.burning, targets)] = parent[
+                                                            source_labels]
+        struck = new_labels < 0
+        nstruck = np.count_nonzero(struck)
+        new_labels[struck] = nfires + np.arange(nstruck)
+
+        # The total size of each fire (at its root), including its new cells.
+        roots = np.concatenate((parent, nfires + np.arange(nstruck)))
+        total = (np.bincount(parent, weights=size, minlength=len(roots))
+                 + np.bincount(new_labels, minlength=len(roots)))
+
+        # Record the fires which have gone out, and relabel the rest.
+        active = np.zeros(len(roots), dtype=bool)
+        active[new_labels] = True
+        if self.record:
+            done = (roots == np.arange(len(roots))) & ~active
+            self.histogram.update(total[done].astype(np.int64).tolist())
+        active_roots = np.flatnonzero(active)
+        self.labels = np.searchsorted(active_roots, new_labels)
+        self.size = total[active_roots].astype(np.int64)
+        return nstrikes
+
+def size_histogram(seed, nx=500, ny=500, p=0.05, f=0.0001, nsteps=10000,
+                   burn_in=1000, forest_fraction=0.2):
+    """Return the Counter of fire sizes from a single seeded run.
+
+    Only the fires which go out after the first burn_in steps are counted,
+    so that the forest has reached its steady state.
+
+    """
+
+    rng = np.random.default_rng(seed)
+    forest = FireClusters(random_forest(nx, ny, forest_fraction, rng), p, f,
+                          rng)
+    for step in range(nsteps):
+        forest.record = step >= burn_in
+        forest.step()
+    return forest.histogram
+
+def ensemble(seeds, max_workers=None, **kwargs):
+    """Return the combined fire size histogram of runs from each seed.
+
+    The runs, with parameters kwargs passed to size_histogram, are executed
+    in a pool of max_workers processes. The histogram is returned as arrays
+    of the fire sizes and the number of fires of each size.
+
+    """
+
+    histogram = Counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(size_histogram, seed, **kwargs)
+                   for seed in seeds]
+        for future in futures:
+            histogram += future.result()
+    sizes = np.array(sorted(histogram))
+    return sizes, np.array([histogram[s] for s in sizes])
+
+if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
+    sizes, counts = ensemble(range(8), nx=300, ny=300, nsteps=5000)
+    plt.loglog(sizes, counts / counts.sum(), '.')
+    plt.xlabel('Fire size')
+    plt.ylabel('Probability')
+    plt.show()
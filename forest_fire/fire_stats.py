@@ -0,0 +1,141 @@
+import os
+import json
+import argparse
+import numpy as np
+
+from forest_fire import TREE, FIRE, initial_forest, iterate
+from sparse_forest import SparseForest, random_forest
+
+# Run the forest-fire model headless for long times (for example, to study
+# its self-organized criticality), logging statistics for every generation:
+# the numbers of trees and of burning cells and the number of new fires
+# started by lightning. The log is written in chunks, either as packed binary
+# records or, if its filename ends in '.csv', as CSV; the state of the run is
+# checkpointed periodically so that it can be resumed if interrupted.
+
+# The record written to the log for each step; the tree density is the
+# number of trees divided by the (nx-2)(ny-2) interior cells of the forest.
+LOG_DTYPE = np.dtype([('step', '<u8'), ('trees', '<u4'), ('burning', '<u4'),
+                      ('strikes', '<u4')])
+
+def _write_chunk(fo, records, csv):
+    if csv:
+        np.savetxt(fo, records, fmt='%d', delimiter=',')
+    else:
+        fo.write(records.tobytes())
+
+def load_log(filename):
+    """Return the statistics logged to filename as a structured array."""
+
+    if filename.endswith('.csv'):
+        return np.loadtxt(filename, dtype=LOG_DTYPE, delimiter=',', skiprows=1,
+                          ndmin=1)
+    return np.fromfile(filename, dtype=LOG_DTYPE)
+
+def save_checkpoint(filename, X, step, rng, log_size, params):
+    """Save the state of a run to the .npz file filename.
+
+    The file is written to a temporary file first and then renamed, so an
+    existing checkpoint is never left half-written.
+
+    """
+
+    tmp = filename + '.tmp'
+    with open(tmp, 'wb') as fo:
+        np.savez_compressed(fo, X=X, step=step, log_size=log_size,
+                            rng_state=json.dumps(rng.bit_generator.state),
+                            params=json.dumps(params))
+    os.replace(tmp, filename)
+
+def load_checkpoint(filename):
+    """Load a checkpoint; return (X, step, rng, log_size, params)."""
+
+    with np.load(filename) as data:
+        rng = np.random.default_rng()
+        rng.bit_generator.state = json.loads(str(data['rng_state']))
+        return (data['X'], int(data['step']), rng, int(data['log_size']),
+                json.loads(str(data['params'])))
+
+def run(nsteps, log_filename, checkpoint_filename=None, nx=1000, ny=1000,
+        p=0.05, f=0.0001, forest_fraction=0.2, seed=None, chunk=4096,
+        checkpoint_every=100000, sparse=False):
+    """Run the forest-fire model for nsteps steps, logging its statistics.
+
+    The statistics are buffered and written to log_filename every chunk
+    steps. If checkpoint_filename is given, the forest, the random number
+    generator state and the position in the log are saved there every
+    checkpoint_every steps and at the end; if it already exists, the run is
+    resumed from it (with its own parameters) and the log is truncated back
+    to the checkpointed step before continuing, up to a total of nsteps.
+    If sparse is True, the forest is advanced by a SparseForest, which
+    follows only the burning cells, rather than by iterate.
+
+    """
+
+    csv = log_filename.endswith('.csv')
+    params = dict(nx=nx, ny=ny, p=p, f=f, forest_fraction=forest_fraction)
+    if checkpoint_filename and os.path.exists(checkpoint_filename):
+        X, step, rng, log_size, params = load_checkpoint(checkpoint_filename)
+        p, f = params['p'], params['f']
+        fo = open(log_filename, 'r+b')
+        fo.truncate(log_size)
+        fo.seek(log_size)
+    else:
+        rng = np.random.default_rng(seed)
+        if sparse:
+            X = random_forest(nx, ny, forest_fraction, rng)
+        else:
+            X = initial_forest(nx, ny, forest_fraction, rng)
+        step = 0
+        fo = open(log_filename, 'wb')
+        if csv:
+            fo.write((','.join(LOG_DTYPE.names) + '\n').encode())
+
+    if sparse:
+        forest = SparseForest(X, p, f, rng)
+    records = np.zeros(chunk, dtype=LOG_DTYPE)
+    n = 0
+    with fo:
+        while step < nsteps:
+            if sparse:
+                strikes = forest.step()
+                records[n] = (step + 1, forest.ntrees, len(forest.burning),
+                              strikes)
+            else:
+                X, strikes = iterate(X, p, f, rng, return_strikes=True)
+                counts = np.bincount(X.ravel(), minlength=3)
+                records[n] = step + 1, counts[TREE], counts[FIRE], strikes
+            step += 1
+            n += 1
+            checkpoint = checkpoint_filename and (step == nsteps
+                                            or not step % checkpoint_every)
+            if n == chunk or step == nsteps or checkpoint:
+                _write_chunk(fo, records[:n], csv)
+                n = 0
+            if checkpoint:
+                fo.flush()
+                save_checkpoint(checkpoint_filename, X, step, rng, fo.tell(),
+                                params)
+    return X
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the forest-fire model'
+                                     ' headless, logging its statistics.')
+    parser.add_argument('nsteps', type=int, help='total number of steps')
+    parser.add_argument('log', help='log file (CSV if it ends in .csv)')
+    parser.add_argument('--checkpoint', help='checkpoint file to save to'
+                        ' and resume from')
+    parser.add_argument('--nx', type=int, default=1000)
+    parser.add_argument('--ny', type=int, default=1000)
+    parser.add_argument('-p', type=float, default=0.05,
+                        help='tree growth probability')
+    parser.add_argument('-f', type=float, default=0.0001,
+                        help='lightning strike probability')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--checkpoint-every', type=int, default=100000)
+    parser.add_argument('--sparse', action='store_true', help='follow only'
+                        ' the burning cells (for very large forests)')
+    args = parser.parse_args()
+    run(args.nsteps, args.log, args.checkpoint, args.nx, args.ny, args.p,
+        args.f, seed=args.seed, checkpoint_every=args.checkpoint_every,
+        sparse=args.sparse)
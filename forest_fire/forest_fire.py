@@ -1,7 +1,10 @@
+import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib import animation
-from matplotlib import colors
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from frame_sink import FrameSink
 
 # Create a forest fire animation based on a simple cellular automaton model.
 # The maths behind this code is described in the scipython blog article
@@ -9,41 +12,15 @@ from matplotlib import colors
 # Christian Hill, January 2016.
 # Updated January 2020.
 
-# Displacements from a cell to its eight nearest neighbours
-neighbourhood = ((-1,-1), (-1,0), (-1,1), (0,-1), (0, 1), (1,-1), (1,0), (1,1))
 EMPTY, TREE, FIRE = 0, 1, 2
 # Colours for visualization: brown for EMPTY, dark green for TREE and orange
-# for FIRE. Note that for the colormap to work, this list and the bounds list
-# must be one larger than the number of different values in the array.
-colors_list = [(0.2,0,0), (0,0.5,0), (1,0,0), 'orange']
-cmap = colors.ListedColormap(colors_list)
-bounds = [0,1,2,3]
-norm = colors.BoundaryNorm(bounds, cmap.N)
+# for FIRE, as RGB triples indexed by cell state.
+PALETTE = [(51, 0, 0), (0, 128, 0), (255, 165, 0)]
 
-def iterate(X):
-    """Iterate the forest according to the forest-fire rules."""
-
-    # The boundary of the forest is always empty, so only consider cells
-    # indexed from 1 to nx-2, 1 to ny-2
-    X1 = np.zeros((ny, nx))
-    for ix in range(1,nx-1):
-        for iy in range(1,ny-1):
-            if X[iy,ix] == EMPTY and np.random.random() <= p:
-                X1[iy,ix] = TREE
-            if X[iy,ix] == TREE:
-                X1[iy,ix] = TREE
-                for dx,dy in neighbourhood:
-                    # The diagonally-adjacent trees are further away, so
-                    # only catch fire with a reduced probability:
-                    if abs(dx) == abs(dy) and np.random.random() < 0.573:
-                        continue
-                    if X[iy+dy,ix+dx] == FIRE:
-                        X1[iy,ix] = FIRE
-                        break
-                else:
-                    if np.random.random() <= f:
-                        X1[iy,ix] = FIRE
-    return X1
+# The probability that a tree does not catch fire from a burning neighbour
+# diagonally adjacent to it: such trees are further away, so are less likely
+# to ignite than those next to a burning orthogonal neighbour.
+DIAGONAL_SKIP = 0.573
 
 # The initial fraction of the forest occupied by trees.
 forest_fraction = 0.2
@@ -51,25 +28,106 @@ forest_fraction = 0.2
 p, f = 0.05, 0.0001
 # Forest size (number of cells in x and y directions).
 nx, ny = 100, 100
+# The random number generator for the simulation.
+rng = np.random.default_rng()
+
+def initial_forest(nx, ny, forest_fraction=forest_fraction, rng=rng):
+    """Return a forest grid of nx x ny cells, with trees in a random fraction
+    forest_fraction of its interior cells.
+
+    """
+
+    X = np.zeros((ny, nx), dtype=np.uint8)
+    X[1:ny-1, 1:nx-1] = rng.random((ny-2, nx-2)) < forest_fraction
+    return X
+
+def burning_neighbours(X):
+    """Return the numbers of burning orthogonal and diagonal neighbours of
+    each interior cell of the forest X.
+
+    """
+
+    F = (X == FIRE).view(np.uint8)
+    orthogonal = F[:-2, 1:-1] + F[2:, 1:-1]
+    orthogonal += F[1:-1, :-2]
+    orthogonal += F[1:-1, 2:]
+    diagonal = F[:-2, :-2] + F[:-2, 2:]
+    diagonal += F[2:, :-2]
+    diagonal += F[2:, 2:]
+    return orthogonal, diagonal
+
+def iterate(X, p=p, f=f, rng=rng, return_strikes=False):
+    """Iterate the forest according to the forest-fire rules.
+
+    The whole grid is updated at once from shifted slices of X, with a single
+    random number per cell. An empty cell grows a tree with probability p.
+    A tree catches fire if an orthogonal neighbour is burning; otherwise each
+    burning diagonal neighbour ignites it with probability 1 - DIAGONAL_SKIP
+    and lightning with probability f, so with k burning diagonal neighbours
+    it stays unburnt with probability (1 - f) * DIAGONAL_SKIP**k. If
+    return_strikes is True, the number of new fires started by lightning (in
+    trees with no burning neighbours) is also returned.
+
+    """
+
+    # The boundary of the forest is always empty, so only consider cells
+    # indexed from 1 to nx-2, 1 to ny-2
+    orthogonal, diagonal = burning_neighbours(X)
+    interior = X[1:-1, 1:-1]
+    u = rng.random(interior.shape, dtype=np.float32)
+    unburnt = ((1 - f) * DIAGONAL_SKIP**np.arange(5)).astype(np.float32)
+
+    X1 = np.zeros_like(X)
+    X1[1:-1, 1:-1][(interior == EMPTY) & (u <= p)] = TREE
+    tree = interior == TREE
+    X1[1:-1, 1:-1][tree] = TREE
+    fire = tree & ((orthogonal > 0) | (u >= unburnt[diagonal]))
+    X1[1:-1, 1:-1][fire] = FIRE
+    if return_strikes:
+        strikes = np.count_nonzero(fire & (orthogonal == 0) & (diagonal == 0))
+        return X1, strikes
+    return X1
+
 # Initialize the forest grid.
-X  = np.zeros((ny, nx))
-X[1:ny-1, 1:nx-1] = np.random.randint(0, 2, size=(ny-2, nx-2))
-X[1:ny-1, 1:nx-1] = np.random.random(size=(ny-2, nx-2)) < forest_fraction
-
-fig = plt.figure(figsize=(25/3, 6.25))
-ax = fig.add_subplot(111)
-ax.set_axis_off()
-im = ax.imshow(X, cmap=cmap, norm=norm)#, interpolation='nearest')
-
-# The animation function: called to produce a frame for each generation.
-def animate(i):
-    im.set_data(animate.X)
-    animate.X = iterate(animate.X)
-# Bind our grid to the identifier X in the animate function's namespace.
-animate.X = X
-
-# Interval between frames (ms).
-interval = 100
-anim = animation.FuncAnimation(fig, animate, interval=interval, frames=200)
-#anim.save("forest_fire.mp4")
-plt.show()
+X = initial_forest(nx, ny)
+
+# Interval between frames (ms) and number of frames.
+interval, nframes = 100, 200
+
+if __name__ == '__main__' and len(sys.argv) > 1:
+    # Write the animation to the file given on the command line: an animated
+    # PNG or GIF, or a sequence of PNG images if it is a filename template
+    # such as 'frames/forest{:04d}.png'.
+    with FrameSink(sys.argv[1], PALETTE, scale=4, delay=interval) as frames:
+        for i in range(nframes):
+            frames.add(X)
+            X = iterate(X)
+
+elif __name__ == '__main__':
+    import matplotlib.pyplot as plt
+    from matplotlib import animation
+    from matplotlib import colors
+
+    # Note that for the colormap to work, this list and the bounds list must
+    # be one larger than the number of different values in the array.
+    colors_list = [(0.2,0,0), (0,0.5,0), (1,0,0), 'orange']
+    cmap = colors.ListedColormap(colors_list)
+    bounds = [0,1,2,3]
+    norm = colors.BoundaryNorm(bounds, cmap.N)
+
+    fig = plt.figure(figsize=(25/3, 6.25))
+    ax = fig.add_subplot(111)
+    ax.set_axis_off()
+    im = ax.imshow(X, cmap=cmap, norm=norm)#, interpolation='nearest')
+
+    # The animation function: called to produce a frame for each generation.
+    def animate(i):
+        im.set_data(animate.X)
+        animate.X = iterate(animate.X)
+    # Bind our grid to the identifier X in the animate function's namespace.
+    animate.X = X
+
+    anim = animation.FuncAnimation(fig, animate, interval=interval,
+                                   frames=nframes)
+    #anim.save("forest_fire.mp4")
+    plt.show()
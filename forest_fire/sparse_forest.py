@@ -0,0 +1,147 @@
+import numpy as np
+
+from forest_fire import EMPTY, TREE, FIRE, DIAGONAL_SKIP
+
+# A sparse engine for the forest-fire model on very large grids. In the
+# steady state only a small fraction of the cells are burning, so rather than
+# updating the whole grid each step, the burning cells are kept as an array
+# of their (flat) indexes and only their neighbours are examined. Lightning
+# strikes and new trees are handled by drawing how many there are from a
+# binomial distribution and then picking that many cells at random, so the
+# cost of each step scales with the size of the fire front and the number of
+# changes rather than the area of the forest.
+
+def random_forest(nx, ny, forest_fraction=0.2, rng=None, block=1024):
+    """Return a forest grid of nx x ny cells, with trees in a random fraction
+    forest_fraction of its interior cells.
+
+    The grid is filled block rows at a time, to limit the memory needed for
+    the random numbers.
+
+    """
+
+    rng = np.random.default_rng(rng)
+    X = np.zeros((ny, nx), dtype=np.uint8)
+    for y0 in range(1, ny-1, block):
+        y1 = min(y0 + block, ny-1)
+        X[y0:y1, 1:nx-1] = rng.random((y1 - y0, nx-2),
+                                      dtype=np.float32) < forest_fraction
+    return X
+
+def _unique(i):
+    """Return the sorted unique values of the index array i.
+
+    This sorts and compares neighbours, which is much faster for large
+    arrays than np.unique (which may use a hash table).
+
+    """
+
+    i = np.sort(i)
+    return i[np.concatenate(([True], i[1:] != i[:-1]))] if len(i) else i
+
+class SparseForest:
+    """The forest-fire model, updated by following its burning cells.
+
+    The forest grid X is updated in place by step, with the same rules (and
+    the same distribution of outcomes) as forest_fire.iterate: a tree catches
+    fire from a burning orthogonal neighbour, from each burning diagonal
+    neighbour with probability 1 - DIAGONAL_SKIP, and from lightning with
+    probability f; an empty cell grows a tree with probability p. The
+    boundary of the forest is always empty.
+
+    """
+
+    def __init__(self, X, p=0.05, f=0.0001, rng=None):
+        self.X = X
+        self.ny, self.nx = X.shape
+        self.flat = X.reshape(-1)
+        self.p, self.f = p, f
+        self.rng = np.random.default_rng(rng)
+        self.burning = np.flatnonzero(self.flat == FIRE)
+        counts = np.bincount(self.flat, minlength=3)
+        self.ntrees = int(counts[TREE])
+        # The number of empty cells in the interior of the forest.
+        self.nempty = ((self.nx-2) * (self.ny-2) - self.ntrees
+                       - len(self.burning))
+        nx = self.nx
+        self.orthogonal = (-nx, nx, -1, 1)
+        self.diagonal = (-nx-1, -nx+1, nx-1, nx+1)
+
+    def _sample(self, k, state, new_state):
+        """Change the state of k randomly chosen interior cells in state.
+
+        The cells are found by rejection sampling: random interior cells are
+        drawn in batches and kept if they are in state and haven't already
+        been changed to new_state, which is set as they are accepted. Each
+        batch is sized to find slightly fewer than the cells still needed,
+        and if it finds too many a random subset of them is kept. Returns
+        the indexes of the cells changed.
+
+        """
+
+        nx, ny, rng = self.nx, self.ny, self.rng
+        n = self.ntrees if state == TREE else self.nempty
+        fraction = n / ((nx-2) * (ny-2))
+        chosen = []
+        while k > 0:
+            m = int(0.98 * k / fraction) + 16
+            i = (rng.integers(1, ny-1, m) * nx + rng.integers(1, nx-1, m))
+            i = _unique(i[self.flat[i] == state])
+            if len(i) > k:
+                i = rng.choice(i, k, replace=False)
+            self.flat[i] = new_state
+            chosen.append(i)
+            k -= len(i)
+        return np.concatenate(chosen) if chosen else np.array([], dtype=int)
+
+    def step(self):
+        """Advance the forest by one step; return the number of strikes.
+
+        As for iterate, lightning strikes are counted only in trees with no
+        burning neighbours, which can't have been set alight any other way.
+        The pairs of cells the fire spread between are left in the attribute
+        spread.
+
+        """
+
+        flat, rng, burning = self.flat, self.rng, self.burning
+
+        # Trees set alight by their burning neighbours: the fire spreads
+        # from the cells at positions sources in burning to the trees with
+        # indexes targets (which may be set alight more than once).
+        sources, targets = [], []
+        for offsets, skip in ((self.orthogonal, 0),
+                              (self.diagonal, DIAGONAL_SKIP)):
+            for offset in offsets:
+                k = np.flatnonzero(flat[burning + offset] == TREE)
+                if skip:
+                    k = k[rng.random(len(k)) >= skip]
+                sources.append(k)
+                targets.append(burning[k] + offset)
+        self.spread = np.concatenate(sources), np.concatenate(targets)
+        ignited = _unique(self.spread[1])
+
+        # Lightning strikes each tree independently with probability f: the
+        # number of strikes is binomially distributed. Only those in trees
+        # with no burning neighbours are counted, since a strike next to a
+        # fire could also have been the fire spreading (burning is sorted).
+        struck = self._sample(rng.binomial(self.ntrees, self.f), TREE, FIRE)
+        flat[ignited] = FIRE
+        new_fires = _unique(np.concatenate((ignited, struck)))
+        isolated = np.ones(len(struck), dtype=bool)
+        if len(burning):
+            for offset in self.orthogonal + self.diagonal:
+                i = struck + offset
+                k = np.minimum(np.searchsorted(burning, i), len(burning) - 1)
+                isolated &= burning[k] != i
+        nstrikes = np.count_nonzero(isolated)
+
+        # New trees grow in the cells which were empty; the burning cells
+        # are still marked as FIRE, so can't be chosen.
+        grown = self._sample(rng.binomial(self.nempty, self.p), EMPTY, TREE)
+        flat[burning] = EMPTY
+
+        self.burning = new_fires
+        self.ntrees += len(grown) - len(new_fires)
+        self.nempty += len(burning) - len(grown)
+        return nstrikes
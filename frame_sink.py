@@ -0,0 +1,138 @@
+import queue
+import threading
+import numpy as np
+
+from png_writer import write_png, APNGWriter
+
+# An asynchronous sink for the frames of the cellular automaton animations
+# (the maze and forest-fire models). Each frame is a 2D array of small
+# integer cell states, which is coloured through a palette lookup table and
+# encoded by a background thread, so the simulation loop only has to copy
+# its state and never waits on the image encoding. The frames can be written
+# as a sequence of PNG images, an animated PNG or (if Pillow is installed)
+# an animated GIF.
+
+class FrameSink:
+    """Write the frames of an animation from a background thread.
+
+    filename selects the output: a template containing a '{}' replacement
+    field, such as 'frames/_img{:04d}.png', writes each frame to its own
+    PNG file, formatted with the index passed to add (or the frame count);
+    a name ending in '.gif' writes an animated GIF and any other name an
+    animated PNG, showing each frame for delay ms. palette is a sequence of
+    RGB colours, one for each cell state, and each cell is drawn as a
+    scale x scale block of pixels. At most maxsize frames are queued, after
+    which add blocks until the writer catches up.
+
+    """
+
+    def __init__(self, filename, palette, scale=1, delay=100, maxsize=8,
+                 level=6):
+        self.filename = filename
+        self.lut = np.array(palette, dtype=np.uint8)
+        self.scale, self.delay, self.level = scale, delay, level
+        self.nframes = 0
+        self.error = None
+        self.closed = False
+        self.queue = queue.Queue(maxsize)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def add(self, X, i=None):
+        """Queue a copy of the state X to be written as the next frame."""
+
+        if self.error:
+            raise self.error
+        if i is None:
+            i = self.nframes
+        self.queue.put((i, np.array(X, dtype=np.uint8)))
+        self.nframes += 1
+
+    def rgb(self, X):
+        """Return the RGB image of the state X."""
+
+        rgb = self.lut[X]
+        if self.scale > 1:
+            rgb = rgb.repeat(self.scale, axis=0).repeat(self.scale, axis=1)
+        return rgb
+
+    def _states(self):
+        """Yield (index, state) for each queued frame, until closed."""
+
+        for item in iter(self.queue.get, None):
+            yield item
+        self.closed = True
+
+    def _frames(self):
+        """Yield (index, RGB image) for each queued frame, until closed."""
+
+        for i, X in self._states():
+            yield i, self.rgb(X)
+
+    def _run(self):
+        try:
+            if '{' in self.filename:
+                for i, rgb in self._frames():
+                    write_png(self.filename.format(i), rgb.shape[1],
+                              rgb.shape[0], (rgb,), self.level)
+            elif self.filename.lower().endswith('.gif'):
+                self._write_gif()
+            else:
+                self._write_apng()
+        except Exception as e:
+            self.error = e
+            # Drain the queue so that add doesn't block forever.
+            if not self.closed:
+                for _ in self._states():
+                    pass
+
+    def _write_apng(self):
+        writer = None
+        for _, rgb in self._frames():
+            if writer is None:
+                writer = APNGWriter(self.filename, rgb.shape[1], rgb.shape[0],
+                                    self.delay, level=self.level)
+            writer.add_frame(rgb)
+        if writer is not None:
+            writer.close()
+
+    def _write_gif(self):
+        # The cell states are written directly as palette indexes, so no
+        # colour quantization is needed.
+        from PIL import Image
+
+        palette = self.lut.ravel().tolist()
+
+        def images():
+            for _, X in self._states():
+                if self.scale > 1:
+                    X = X.repeat(self.scale, axis=0).repeat(self.scale,
+                                                            axis=1)
+                im = Image.fromarray(X)
+                im.putpalette(palette)
+                yield im
+
+        images = images()
+        first = next(images, None)
+        if first is not None:
+            first.save(self.filename, save_all=True, append_images=images,
+                       duration=self.delay, loop=0)
+
+    def close(self):
+        """Wait for all the queued frames to be written."""
+
+        self.queue.put(None)
+        self.thread.join()
+        if self.error:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            self.close()
+        except Exception:
+            # Don't mask an exception raised by (or through) the with block.
+            if exc_type is None:
+                raise
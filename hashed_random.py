@@ -0,0 +1,34 @@
+import numpy as np
+
+# Counter-based random numbers, shared by the projects in this repository
+# which need random numbers that depend only on a seed and some integer
+# coordinates (such as a maze's index in a batch, or a point's position in
+# an infinite terrain) rather than on the order in which they are drawn. The
+# numbers are obtained by hashing the seed and coordinates together with the
+# splitmix64 finalizer.
+
+GOLDEN = np.uint64(0x9e3779b97f4a7c15)
+
+def mix(x):
+    """The splitmix64 finalizer: scramble the bits of the uint64 array x."""
+
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xbf58476d1ce4e5b9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94d049bb133111eb)
+    return x ^ (x >> np.uint64(31))
+
+def hashed_uniform(seed, *keys):
+    """Return uniform random numbers in [0, 1) hashed from seed and keys.
+
+    seed and the keys are integers or integer arrays (negative values are
+    allowed), which are broadcast against each other; the same seed and keys
+    always give the same number.
+
+    """
+
+    with np.errstate(over='ignore'):
+        h = mix(np.asarray(seed).astype(np.uint64))
+        for key in keys:
+            h = mix(h ^ (np.asarray(key).astype(np.uint64) * GOLDEN))
+    return (h >> np.uint64(11)) * 2.0**-53
@@ -0,0 +1,139 @@
+# batch.py
+import struct
+import numpy as np
+
+from df_maze import N, S, E, W, ALL_WALLS
+import hashed_random
+
+# Generate large batches of small mazes at once, as a (B, ny, nx) array of
+# wall bit flags (as Maze.walls), by running Eller's algorithm on every maze
+# in the batch simultaneously. Each maze has its own seed, from which its
+# random numbers are derived by hashing (see hashed_random), so a maze
+# depends only on its seed and not on the rest of the batch. The batches can
+# be saved in a compact binary format of two bits per cell.
+
+# File signature and format version for saved batches of mazes.
+MAGIC, VERSION = b'MAZE', 1
+HEADER = struct.Struct('<4sBIHH')
+
+def hashed_uniform(seeds, counter, n):
+    """Return a (B, n) array of uniform random numbers in [0, 1).
+
+    Row b holds the random numbers counter, counter+1, ..., counter+n-1 of
+    the stream belonging to seeds[b].
+
+    """
+
+    k = np.arange(counter, counter + n, dtype=np.uint64)
+    return hashed_random.hashed_uniform(seeds[:, None], k)
+
+def batch_eller(seeds, nx=15, ny=15, p_join=0.5, p_down=0.5):
+    """Return the walls of a maze of nx x ny cells for each seed in seeds.
+
+    The mazes are carved by Eller's algorithm (see generators.eller_rows),
+    with each step vectorized over the whole batch. Rather than tracking
+    sets with a union-find, each cell's set label is the column index of a
+    representative cell, so the labels stay small and can be compared for
+    all mazes at once.
+
+    """
+
+    seeds = np.asarray(seeds, dtype=np.uint64)
+    B = len(seeds)
+    walls = np.full((B, ny, nx), ALL_WALLS, dtype=np.uint8)
+    labels = np.tile(np.arange(nx), (B, 1))
+    counter = 0
+    for y in range(ny):
+        row = walls[:, y]
+        last = y == ny - 1
+        if last:
+            join = np.ones((B, nx-1), dtype=bool)
+        else:
+            join = hashed_uniform(seeds, counter, nx-1) < p_join
+            counter += nx - 1
+        for x in range(nx-1):
+            a, b = labels[:, x], labels[:, x+1]
+            j = join[:, x] & (a != b)
+            row[j, x] &= ALL_WALLS ^ E
+            row[j, x+1] &= ALL_WALLS ^ W
+            # Merge b's set into a's in the mazes where they were joined.
+            merge = j[:, None] & (labels == b[:, None])
+            labels = np.where(merge, a[:, None], labels)
+        if last:
+            break
+
+        # Connect cells down at random, and also the cell with the highest
+        # priority in each set so that every set is connected down.
+        down = hashed_uniform(seeds, counter, nx) < p_down
+        priority = hashed_uniform(seeds, counter + nx, nx)
+        counter += 2 * nx
+        same = labels[:, :, None] == labels[:, None, :]
+        top = np.where(same, priority[:, None, :], -1).max(axis=2)
+        down |= priority == top
+        row[down] &= ALL_WALLS ^ S
+        walls[:, y+1][down] &= ALL_WALLS ^ N
+        # Continuing sets are relabelled by their first connected-down cell,
+        # and the other cells start new sets labelled by their own column.
+        rep = np.argmax(same & down[:, None, :], axis=2)
+        labels = np.where(down, rep, np.arange(nx))
+    return walls
+
+def pack_walls(walls):
+    """Pack a (B, ny, nx) walls array into two bits (E, S) per cell.
+
+    The North and West walls are implied by the neighbouring cells' South
+    and East walls and the maze border. Each maze is padded to a whole
+    number of bytes, so it can be read independently.
+
+    """
+
+    es = np.stack(((walls & E) != 0, (walls & S) != 0), axis=-1)
+    return np.packbits(es.reshape(len(walls), -1), axis=1)
+
+def unpack_walls(packed, nx, ny):
+    """Unpack the walls array of B mazes from their packed (E, S) bits."""
+
+    B = len(packed)
+    es = np.unpackbits(packed, axis=1, count=2*nx*ny).reshape(B, ny, nx, 2)
+    walls = np.where(es[..., 0], E, 0) | np.where(es[..., 1], S, 0)
+    walls[:, :, 1:] |= np.where(es[:, :, :-1, 0], W, 0)
+    walls[:, 1:] |= np.where(es[:, :-1, :, 1], N, 0)
+    walls[:, :, 0] |= W
+    walls[:, 0] |= N
+    return walls.astype(np.uint8)
+
+def save_batch(filename, walls, seeds=None):
+    """Save a batch of mazes (and, optionally, their seeds) to filename.
+
+    The file holds a header (signature, version, B, ny, nx), then a flag
+    byte and the B uint64 seeds if present, then each maze packed into
+    ceil(2.nx.ny / 8) bytes.
+
+    """
+
+    B, ny, nx = walls.shape
+    with open(filename, 'wb') as fo:
+        fo.write(HEADER.pack(MAGIC, VERSION, B, ny, nx))
+        fo.write(bytes([seeds is not None]))
+        if seeds is not None:
+            fo.write(np.asarray(seeds, dtype='<u8').tobytes())
+        fo.write(pack_walls(walls).tobytes())
+
+def load_batch(filename):
+    """Load a batch of mazes from filename; return (walls, seeds).
+
+    seeds is None if they weren't saved. A single maze can be used as a Maze
+    by assigning its walls: maze = Maze(nx, ny); maze.walls = walls[i].
+
+    """
+
+    with open(filename, 'rb') as fi:
+        magic, version, B, ny, nx = HEADER.unpack(fi.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{filename} is not a version {VERSION} maze'
+                             ' batch file')
+        seeds = None
+        if fi.read(1)[0]:
+            seeds = np.frombuffer(fi.read(8 * B), dtype='<u8')
+        packed = np.frombuffer(fi.read(), dtype=np.uint8).reshape(B, -1)
+    return unpack_walls(packed, nx, ny), seeds
@@ -1,6 +1,11 @@
+import os
+import sys
+import hashlib
 import numpy as np
-from scipy.signal import convolve2d
-import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from frame_sink import FrameSink
 
 # Create a maze using the cellular automaton approach described at
 # https://scipython.com/blog/maze-generation-by-cellular-automaton/
@@ -8,39 +13,211 @@ import matplotlib.pyplot as plt
 # the subdirectory ca_frames/.
 # Christian Hill, January 2018.
 
-def ca_step(X):
-    """Evolve the maze by a single CA step."""
-
-    K = np.ones((3, 3))
-    n = convolve2d(X, K, mode='same', boundary='wrap') - X
-    return (n == 3) | (X & ((n > 0) & (n < 6)))
-
-# Maze size
-nx, ny = 200, 150
-X = np.zeros((ny, nx), dtype=np.bool)
-# Size of initial random area (must be even numbers)
-mx, my = 20, 16
-
-# Initialize a patch with a random mx x my region
-r = np.random.random((my, mx)) > 0.75
-X[ny//2-my//2:ny//2+my//2, nx//2-mx//2:nx//2+mx//2] = r
-
-# Total number of iterations
-nit = 400
-# Make an image every ipf iterations
-ipf = 10
-
-# Figure dimensions (pixels) and resolution (dpi)
-width, height, dpi = 600, 450, 10
-fig = plt.figure(figsize=(width/dpi, height/dpi), dpi=dpi)
-ax = fig.add_subplot(111)
-
-for i in range(nit):
-    X = ca_step(X)
-    if not i % ipf:
-        print('{}/{}'.format(i,nit))
-        im = ax.imshow(X, cmap=plt.cm.binary, interpolation='nearest')
-        plt.axis('off')
-        plt.savefig('ca_frames/_img{:04d}.png'.format(i), dpi=dpi)
-        plt.cla()
-    
+def rule_table(birth, survive):
+    """Return the lookup table of new cell states for a Life-like rule.
+
+    A dead cell comes alive if its number of live neighbours is in birth and
+    a live cell survives if it is in survive. The table is indexed by
+    10*X + s, where X is a cell's state (0 or 1) and s is the number of live
+    cells in its 3x3 neighbourhood, including itself.
+
+    """
+
+    lut = np.zeros(20, dtype=np.uint8)
+    lut[list(birth)] = 1
+    lut[[10 + n + 1 for n in survive]] = 1
+    return lut
+
+# Some named rules which grow mazes: in Maze, a cell is born with exactly 3
+# live neighbours and survives with 1-5; Mazectric gives longer corridors.
+RULES = {'maze': 'B3/S12345', 'mazectric': 'B3/S1234'}
+
+def parse_rule(rule):
+    """Return the lookup table for a rule string, such as 'B3/S12345'.
+
+    rule may also be one of the names in RULES.
+
+    """
+
+    rulestring = RULES.get(rule.lower(), rule)
+    try:
+        birth, survive = rulestring.upper().split('/')
+        if birth.startswith('S'):
+            birth, survive = survive, birth
+        if not (birth.startswith('B') and survive.startswith('S')):
+            raise ValueError
+        birth, survive = ({int(c) for c in part[1:]}
+                          for part in (birth, survive))
+        if max(birth | survive, default=0) > 8:
+            raise ValueError
+    except ValueError:
+        raise ValueError(f'Invalid rule string: {rule}') from None
+    return rule_table(birth, survive)
+
+MAZE_RULE = parse_rule('maze')
+
+def neighbourhood_sums(X):
+    """Return the number of live cells in each cell's 3x3 neighbourhood.
+
+    X is a uint8 array of 0s and 1s whose last two axes are the grid, which
+    wraps around at its edges. The sums are accumulated in uint8 from slices
+    of a padded copy of X, along the rows and then down the columns.
+
+    """
+
+    P = np.pad(X, [(0, 0)] * (X.ndim - 2) + [(1, 1), (1, 1)], mode='wrap')
+    H = P[..., :-2] + P[..., 1:-1]
+    H += P[..., 2:]
+    s = H[..., :-2, :] + H[..., 1:-1, :]
+    s += H[..., 2:, :]
+    return s
+
+def _as_uint8(X):
+    """Return the grid X of 0s and 1s (or a bool grid) as a uint8 array."""
+
+    X = np.asarray(X)
+    if X.dtype == bool:
+        return X.view(np.uint8)
+    return X.astype(np.uint8, copy=False)
+
+def ca_step(X, rule=MAZE_RULE):
+    """Evolve the maze by a single CA step.
+
+    X may be a bool or integer array of 0s and 1s; the new state is returned
+    as a uint8 array.
+
+    """
+
+    X = _as_uint8(X)
+    s = neighbourhood_sums(X)
+    s += 10 * X
+    return rule[s]
+
+def _digest(X):
+    """Return a short digest of the state X, for detecting repeated states."""
+
+    return hashlib.blake2b(np.packbits(X).tobytes(), digest_size=16).digest()
+
+def evolve(X, nit=None, rule=MAZE_RULE, callback=None):
+    """Evolve X until it settles, or for at most nit steps if nit is given.
+
+    The CA has settled when it returns to a state it has been in before: a
+    fixed point or a cycle of any length (Mazectric, for example, often
+    settles into cycles of 6 to 84 steps). This is detected by keeping a
+    dictionary of a 16-byte digest of every state seen, with the step at
+    which it was seen. X may be a bool or uint8 grid. callback(i, X), if
+    given, is called with each new state. Returns (X, nsteps, period), where
+    period is the length of the cycle (1 for a fixed point), or 0 if the CA
+    did not settle, that is, no state was repeated, within nit steps.
+
+    """
+
+    X = _as_uint8(X)
+    seen = {_digest(X): 0}
+    i = 0
+    while nit is None or i < nit:
+        X = ca_step(X, rule)
+        i += 1
+        if callback:
+            callback(i, X)
+        digest = _digest(X)
+        if digest in seen:
+            return X, i, i - seen[digest]
+        seen[digest] = i
+    return X, i, 0
+
+def evolve_batch(X, nit=None, rule=MAZE_RULE):
+    """Evolve a (batch, ny, nx) stack of grids until each one settles.
+
+    All the grids still evolving are advanced together by each vectorized
+    step, and each grid is set aside as soon as it settles into a cycle of
+    any length (as for evolve). Returns (X, nsteps, period), where nsteps
+    and period are arrays giving the number of steps taken by each grid and
+    the period it settled into (0 if it did not settle within nit steps).
+
+    """
+
+    X = np.array(X, dtype=np.uint8)
+    B = len(X)
+    nsteps = np.zeros(B, dtype=int)
+    period = np.zeros(B, dtype=int)
+    seen = [{_digest(x): 0} for x in X]
+    active, Y = np.arange(B), X
+    i = 0
+    while len(active) and (nit is None or i < nit):
+        Y = ca_step(Y, rule)
+        i += 1
+        settled = np.zeros(len(active), dtype=bool)
+        for k, b in enumerate(active.tolist()):
+            digest = _digest(Y[k])
+            if digest in seen[b]:
+                settled[k], period[b] = True, i - seen[b][digest]
+            else:
+                seen[b][digest] = i
+        X[active] = Y
+        nsteps[active] = i
+        active, Y = active[~settled], Y[~settled]
+    return X, nsteps, period
+
+def seed_statistics(seeds, nx=200, ny=150, rule='maze', patch=(20, 16),
+                    p=0.25, nit=2000):
+    """Grow a maze from each seed and return statistics on the results.
+
+    Each grid starts with a central patch of (mx, my) cells, each alive with
+    probability p, drawn from a NumPy Generator seeded with its own seed, so
+    the statistics for a seed don't depend on the rest of the batch. The
+    grids are evolved with the named rule or rule string (see parse_rule)
+    by evolve_batch and, without any rendering, the statistics are returned
+    as a structured array with fields seed, nsteps, period and density (the
+    fraction of dead cells, that is, corridors). A period of 0 means that
+    the grid did not settle within nit steps.
+
+    """
+
+    mx, my = patch
+    X = np.zeros((len(seeds), ny, nx), dtype=np.uint8)
+    for x, seed in zip(X, seeds):
+        rng = np.random.default_rng(seed)
+        x[ny//2-my//2:ny//2+my//2, nx//2-mx//2:nx//2+mx//2] = (
+                                            rng.random((my, mx)) < p)
+    X, nsteps, period = evolve_batch(X, nit, parse_rule(rule))
+
+    stats = np.zeros(len(seeds), dtype=[('seed', np.int64), ('nsteps', int),
+                                        ('period', int), ('density', float)])
+    stats['seed'], stats['nsteps'], stats['period'] = seeds, nsteps, period
+    stats['density'] = 1 - X.mean(axis=(1, 2))
+    return stats
+
+if __name__ == '__main__':
+    # Maze size
+    nx, ny = 200, 150
+    X = np.zeros((ny, nx), dtype=np.uint8)
+    # Size of initial random area (must be even numbers)
+    mx, my = 20, 16
+
+    # Initialize a patch with a random mx x my region
+    r = np.random.random((my, mx)) > 0.75
+    X[ny//2-my//2:ny//2+my//2, nx//2-mx//2:nx//2+mx//2] = r
+
+    # Maximum number of iterations: the evolution stops early if the maze
+    # settles down.
+    nit = 400
+    # Make an image every ipf iterations
+    ipf = 10
+
+    # The frames are written by a background thread, as 600 x 450 pixel
+    # images of white corridors and black walls.
+    os.makedirs('ca_frames', exist_ok=True)
+    frames = FrameSink('ca_frames/_img{:04d}.png',
+                       palette=[(255, 255, 255), (0, 0, 0)], scale=3)
+
+    def save_frame(i, X):
+        i -= 1
+        if not i % ipf:
+            print('{}/{}'.format(i,nit))
+            frames.add(X, i)
+
+    X, nsteps, period = evolve(X, nit, callback=save_frame)
+    frames.close()
+    if period:
+        print('Settled after {} steps (period {})'.format(nsteps, period))
@@ -1,16 +1,101 @@
 # df_maze.py
+import os
+import sys
 import random
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from svg_writer import SVGWriter
+from png_writer import write_png
 
 
 # Create a maze using the depth-first algorithm described at
 # https://scipython.com/blog/making-a-maze/
 # Christian Hill, April 2017.
 
+# Bit flags for the walls of each cell in the Maze.walls array.
+N, S, E, W = 1, 2, 4, 8
+ALL_WALLS = N | S | E | W
+
+# The stylesheet for SVG images of mazes.
+SVG_STYLE = """path {
+    fill: none;
+    stroke: #000000;
+    stroke-linecap: square;
+    stroke-width: 5;
+}
+.solution {
+    stroke: rgb(0,0,255);
+}"""
+
+def text_rows(walls):
+    """Return the lines of the (crude) text picture of the rows of walls.
+
+    Each row of cells gives two lines: its East walls and its South walls.
+    The top border of the maze is not included.
+
+    """
+
+    ny, nx = walls.shape
+    chars = np.full((2*ny, 2*nx + 1), ord(' '), dtype=np.uint8)
+    chars[:, 0] = ord('|')
+    chars[0::2, 2::2][(walls & E) != 0] = ord('|')
+    chars[1::2, 2::2] = ord('+')
+    chars[1::2, 1::2][(walls & S) != 0] = ord('-')
+    return [row.tobytes().decode() for row in chars]
+
+def line_masks(walls, excluded=(), y0=0):
+    """Return masks of the horizontal and vertical walls of rows of a maze.
+
+    walls holds the rows of cells starting at row y0. In the returned
+    arrays, h[Y-y0, x] is True if there is a wall from (x, Y) to (x+1, Y)
+    and v[y-y0, X] is True if there is one from (X, y) to (X, y+1); the
+    horizontal lines include those above and below the rows. Walls listed
+    in excluded, as ((x1, y1), (x2, y2)) pairs, are left out.
+
+    """
+
+    h = np.vstack(((walls[:1] & N) != 0, (walls & S) != 0))
+    v = np.hstack(((walls[:, :1] & W) != 0, (walls & E) != 0))
+    nrows = walls.shape[0]
+    for (x1, y1), (x2, y2) in excluded:
+        if y1 == y2 and x2 == x1 + 1 and y0 <= y1 <= y0 + nrows:
+            h[y1 - y0, x1] = False
+        elif x1 == x2 and y2 == y1 + 1 and y0 <= y1 < y0 + nrows:
+            v[y1 - y0, x1] = False
+    return h, v
+
+def _runs(mask):
+    """Return the (row, start, end) of each run of True values in mask."""
+
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    d = np.diff(padded, axis=1)
+    row, start = np.nonzero(d == 1)
+    _, end = np.nonzero(d == -1)
+    return row, start, end
+
+def mask_segments(h, v, y0=0):
+    """Return the end coordinates x1, y1, x2, y2 of the walls in h and v.
+
+    h and v are masks of the horizontal and vertical walls of the rows of a
+    maze starting at y0, as returned by line_masks. Collinear runs of
+    adjacent walls are merged into single segments.
+
+    """
+
+    Y, x1, x2 = _runs(h)
+    X, y1, y2 = _runs(v.T)
+    return np.hstack((np.array((x1, Y + y0, x2, Y + y0)),
+                      np.array((X, y1 + y0, X, y2 + y0))))
+
 class Cell:
     """A cell in the maze.
 
     A maze "Cell" is a point in the grid which may be surrounded by walls to
-    the north, east, south or west.
+    the north, east, south or west. The Maze itself stores its walls in an
+    array of bit flags: Maze.cell_at returns a Cell as a snapshot of them.
 
     """
 
@@ -18,13 +103,16 @@ class Cell:
     wall_pairs = {'N': 'S', 'S': 'N', 'E': 'W', 'W': 'E'}
     # A mapping of cardinal directions to coordinate differences.
     delta = {'W': (-1, 0), 'E': (1, 0), 'S': (0, 1), 'N': (0, -1)}
+    # A mapping of cardinal directions to wall bit flags.
+    bits = {'N': N, 'S': S, 'E': E, 'W': W}
 
-    def __init__(self, x, y):
-        """Initialize the cell at (x,y). At first it is surrounded by walls."""
+    def __init__(self, x, y, walls=ALL_WALLS):
+        """Initialize the cell at (x,y). By default it is surrounded by walls."""
 
         self.x, self.y = x, y
-        self.walls = {'N': True, 'S': True, 'E': True, 'W': True}
-    
+        self.walls = {wall: bool(walls & bit)
+                      for wall, bit in Cell.bits.items()}
+
     def __repr__(self):
         """return a string representation of a cell"""
         return f'({self.x}, {self.y})'
@@ -34,15 +122,15 @@ class Cell:
 
         return all(self.walls.values())
 
-    def knock_down_wall(self, other, wall):
-        """Knock down the wall between cells self and other."""
 
-        self.walls[wall] = False
-        other.walls[Cell.wall_pairs[wall]] = False
+class Maze:
+    """A Maze, represented as a grid of cells.
 
+    The walls of the cells are held in the (ny, nx) uint8 array walls, whose
+    entries are combinations of the bit flags N, S, E and W, so a maze takes
+    about one byte per cell.
 
-class Maze:
-    """A Maze, represented as a grid of cells."""
+    """
 
     def __init__(self, nx, ny, ix=0, iy=0):
         """Initialize the maze grid.
@@ -53,10 +141,13 @@ class Maze:
 
         self.nx, self.ny = nx, ny
         self.ix, self.iy = ix, iy
-        self.maze_map = [[Cell(x, y) for y in range(ny)] for x in range(nx)]
+        self.walls = np.full((ny, nx), ALL_WALLS, dtype=np.uint8)
 
         self.add_begin_end = False
         self.add_treasure = False
+        # The cells marked as the beginning and end of the maze.
+        self.begin = (0, 0)
+        self.end = (nx-1, ny-1)
         self.treasure_x = random.randint(0, self.nx-1)
         self.treasure_y = random.randint(0, self.ny-1)
 
@@ -64,40 +155,150 @@ class Maze:
         # present in the output here.
         self.excluded_walls = [((nx-1, ny), (nx, ny)),
                                ((0, 0), (0, 1))]
-        
-        # Store the solution to the maze
+
+        # Store the solution to the maze, as an array of (x, y) coordinates.
         self.solution = None
 
     def cell_at(self, x, y):
-        """Return the Cell object at (x,y)."""
+        """Return a Cell object describing the walls at (x,y)."""
+
+        return Cell(x, y, self.walls[y, x])
+
+    def knock_down_wall(self, x, y, wall):
+        """Knock down the wall on side wall of the cell at (x,y)."""
 
-        return self.maze_map[x][y]
+        dx, dy = Cell.delta[wall]
+        self.walls[y, x] &= ALL_WALLS ^ Cell.bits[wall]
+        self.walls[y+dy, x+dx] &= ALL_WALLS ^ Cell.bits[Cell.wall_pairs[wall]]
 
 
     def __str__(self):
         """Return a (crude) string representation of the maze."""
 
         maze_rows = ['-' * self.nx * 2]
-        for y in range(self.ny):
-            maze_row = ['|']
-            for x in range(self.nx):
-                if self.maze_map[x][y].walls['E']:
-                    maze_row.append(' |')
-                else:
-                    maze_row.append('  ')
-            maze_rows.append(''.join(maze_row))
-            maze_row = ['|']
-            for x in range(self.nx):
-                if self.maze_map[x][y].walls['S']:
-                    maze_row.append('-+')
-                else:
-                    maze_row.append(' +')
-            maze_rows.append(''.join(maze_row))
+        maze_rows.extend(text_rows(self.walls))
         return '\n'.join(maze_rows)
 
 
+    def wall_segments(self):
+        """Return the end coordinates x1, y1, x2, y2 of the maze's walls.
+
+        Each segment is a run of adjacent walls along a horizontal or
+        vertical line, less any excluded walls.
+
+        """
+
+        return mask_segments(*line_masks(self.walls, self.excluded_walls))
+
+    def raster_stripes(self, cell_size=10, wall_width=2, solution=False,
+                       band=64):
+        """Yield the RGB image of the maze in stripes of band rows of cells.
+
+        Each cell takes cell_size x cell_size pixels, with its North and West
+        walls, if present, drawn wall_width pixels wide along its top and
+        left edges, so the image is nx*cell_size + wall_width pixels wide
+        and ny*cell_size + wall_width high. The solution, if requested, and
+        the beginning, end and treasure (if add_begin_end and add_treasure
+        are set) are drawn in the same colours as by write_svg.
+
+        """
+
+        cs, t = cell_size, wall_width
+        nx, ny = self.nx, self.ny
+        width = nx * cs + t
+        colours = {'wall': (0, 0, 0), 'path': (0, 0, 255),
+                   'green': (0, 128, 0), 'red': (255, 0, 0),
+                   'yellow': (255, 255, 0)}
+
+        # The solution is drawn from the links between each cell on it and
+        # its neighbours along the path: each link is a bar from the cell's
+        # centre to the edge of its block of pixels, drawn from a template.
+        links = None
+        if solution and self.solution is not None:
+            links = np.zeros((ny, nx), dtype=np.uint8)
+            x, y = self.solution.T
+            dx, dy = np.diff(x), np.diff(y)
+            for bit, back, sx, sy in ((E, W, 1, 0), (W, E, -1, 0),
+                                      (S, N, 0, 1), (N, S, 0, -1)):
+                step = (dx == sx) & (dy == sy)
+                links[y[:-1][step], x[:-1][step]] |= bit
+                links[y[1:][step], x[1:][step]] |= back
+            c0, c1 = (cs + t) // 2 - t // 2, (cs + t) // 2 + (t + 1) // 2
+            templates = np.zeros((16, cs, cs), dtype=bool)
+            for code in range(1, 16):
+                templates[code, c0:c1, c0:c1] = True
+                if code & N:
+                    templates[code, :c1, c0:c1] = True
+                if code & S:
+                    templates[code, c0:, c0:c1] = True
+                if code & W:
+                    templates[code, c0:c1, :c1] = True
+                if code & E:
+                    templates[code, c0:c1, c0:] = True
+        markers = []
+        if self.add_begin_end:
+            markers += [(self.begin, 'green'), (self.end, 'red')]
+        if self.add_treasure:
+            markers.append(((self.treasure_x, self.treasure_y), 'yellow'))
+
+        for y0 in range(0, ny, band):
+            y1 = min(y0 + band, ny)
+            last = y1 == ny
+            nrows = (y1 - y0) * cs + (t if last else 0)
+            img = np.full((nrows, width, 3), 255, dtype=np.uint8)
+
+            for (x, y), colour in markers:
+                if y0 <= y < y1:
+                    img[(y - y0) * cs + t:(y - y0 + 1) * cs,
+                        x * cs + t:(x + 1) * cs] = colours[colour]
+            if links is not None:
+                path = templates[links[y0:y1]].transpose(0, 2, 1, 3)
+                path = path.reshape((y1 - y0) * cs, nx * cs)
+                img[:(y1 - y0) * cs, :nx * cs][path] = colours['path']
+
+            # Wall pixels: a horizontal wall from (x, Y) to (x+1, Y) covers
+            # rows Y*cs to Y*cs + t and columns x*cs to (x+1)*cs + t, and a
+            # vertical one similarly; the previous row of cells is needed for
+            # the vertical walls which overhang into this band.
+            ya = max(y0 - 1, 0)
+            h, v = line_masks(self.walls[ya:y1], self.excluded_walls, ya)
+            h, v = h[y0 - ya:], v
+            hpix = np.zeros((h.shape[0], width), dtype=bool)
+            vpix = np.zeros(((y1 - ya) * cs + t, nx + 1), dtype=bool)
+            hrep, vrep = np.repeat(h, cs, axis=1), np.repeat(v, cs, axis=0)
+            for k in range(t + 1):
+                hpix[:, k:k + nx*cs] |= hrep
+                vpix[k:k + (y1 - ya)*cs] |= vrep
+            r = np.arange(nrows)
+            rows = hpix[r // cs]
+            rows[r % cs >= t] = False
+            c = np.arange(width)
+            cols = vpix[(y0 - ya) * cs + r][:, c // cs]
+            cols[:, c % cs >= t] = False
+            img[rows | cols] = colours['wall']
+            yield img
+
+    def write_png(self, filename, cell_size=10, wall_width=2, solution=False):
+        """Write a PNG image of the maze directly from its walls array.
+
+        See raster_stripes for the arguments: the image is rendered and
+        written a band of rows at a time, without creating any vector
+        graphics.
+
+        """
+
+        width = self.nx * cell_size + wall_width
+        height = self.ny * cell_size + wall_width
+        write_png(filename, width, height,
+                  self.raster_stripes(cell_size, wall_width, solution))
+
     def write_svg(self, filename, solution=False):
-        """Write an SVG image of the maze to filename."""
+        """Write an SVG image of the maze to filename.
+
+        The walls are written as a single path; if filename ends in '.svgz'
+        the image is gzip-compressed.
+
+        """
 
         aspect_ratio = self.nx / self.ny
         # Pad the maze all around by this amount.
@@ -108,123 +309,194 @@ class Maze:
         # Scaling factors mapping maze coordinates to image coordinates
         scy, scx = height / self.ny, width / self.nx
 
-        def write_wall(f, x1, y1, x2, y2):
-            """Write a single wall to the SVG image file handle f."""
-
-            if ((x1, y1), (x2, y2)) in self.excluded_walls:
-                print(f'Excluding wall at {((x1, y1), (x2, y2))}')
-                return
-            sx1, sy1, sx2, sy2 = x1*scx, y1*scy, x2*scx, y2*scy
-            print('<line x1="{}" y1="{}" x2="{}" y2="{}"/>'
-                  .format(sx1, sy1, sx2, sy2), file=f)
-
-        def add_cell_rect(f, x, y, colour):
+        def add_cell_rect(svg, x, y, colour):
             pad = 5
-            print(f'<rect x="{scx*x+pad}" y="{scy*y+pad}" width="{scx-2*pad}"'
-                  f' height="{scy-2*pad}" style="fill:{colour}" />', file=f) 
-
-        def add_path_segment(f, cell, next_cell):
-            sx1, sy1 = scx * (cell.x + 0.5), scy * (cell.y + 0.5)
-            sx2, sy2 = scx * (next_cell.x + 0.5), scy * (next_cell.y + 0.5)
-            print(f'<line x1="{sx1}" y1="{sy1}" x2="{sx2}" y2="{sy2}" style="stroke:rgb(0,0,255)" />',
-                  file=f)
+            svg.rect(scx*x+pad, scy*y+pad, scx-2*pad, scy-2*pad,
+                     style=f'fill:{colour}')
 
         # Write the SVG image file for maze
-        with open(filename, 'w') as f:
-            # SVG preamble and styles.
-            print('<?xml version="1.0" encoding="utf-8"?>', file=f)
-            print('<svg xmlns="http://www.w3.org/2000/svg"', file=f)
-            print('    xmlns:xlink="http://www.w3.org/1999/xlink"', file=f)
-            print('    width="{:d}" height="{:d}" viewBox="{} {} {} {}">'
-                  .format(width + 2 * padding, height + 2 * padding,
-                          -padding, -padding, width + 2 * padding, height + 2 * padding),
-                  file=f)
-            print('<defs>\n<style type="text/css"><![CDATA[', file=f)
-            print('line {', file=f)
-            print('    stroke: #000000;\n    stroke-linecap: square;', file=f)
-            print('    stroke-width: 5;\n}', file=f)
-            print(']]></style>\n</defs>', file=f)
-            # Draw the "South" and "East" walls of each cell, if present (these
-            # are the "North" and "West" walls of a neighbouring cell in
-            # general, of course).
-            for x in range(self.nx):
-                for y in range(self.ny):
-                    if self.cell_at(x, y).walls['S']:
-                        x1, y1, x2, y2 = x, y+1, x+1, y+1
-                        write_wall(f, x1, y1, x2, y2)
-                    if self.cell_at(x, y).walls['E']:
-                        x1, y1, x2, y2 = x+1, y, x+1, y+1
-                        write_wall(f, x1, y1, x2, y2)
-
-            # Draw the North and West maze border, which won't have been drawn
-            # by the procedure above.
-            for x in range(self.nx):
-                write_wall(f, x, 0, x+1, 0)
-            for y in range(self.ny):
-                write_wall(f, 0, y, 0, y+1)
-                
-            #print('<line x1="0" y1="0" x2="{}" y2="0"/>'.format(width), file=f)
-            #print('<line x1="0" y1="0" x2="0" y2="{}"/>'.format(height), file=f)
+        with SVGWriter(filename, width + 2 * padding, height + 2 * padding,
+                       view_box=(-padding, -padding, width + 2 * padding,
+                                 height + 2 * padding), style=SVG_STYLE) as svg:
+            x1, y1, x2, y2 = self.wall_segments()
+            svg.segments(x1*scx, y1*scy, x2*scx, y2*scy)
 
             if self.add_begin_end:
-                add_cell_rect(f, 0, 0, 'green')
-                add_cell_rect(f, self.nx - 1, self.ny - 1, 'red')
+                add_cell_rect(svg, *self.begin, 'green')
+                add_cell_rect(svg, *self.end, 'red')
             if self.add_treasure:
-                add_cell_rect(f, self.treasure_x, self.treasure_y, 'yellow')
+                add_cell_rect(svg, self.treasure_x, self.treasure_y, 'yellow')
 
             if solution:
                 if self.solution is None:
                     print('Error:  There is no solution stored.')
                 else:
-                    for i, cell in enumerate(self.solution[:-1]):
-                        next_cell = self.solution[i+1]
-                        add_path_segment(f, cell, next_cell)
+                    x, y = self.solution.T + 0.5
+                    svg.polyline(x*scx, y*scy, cls='solution')
 
-            print('</svg>', file=f)
 
+    def get_solution(self):
+        return self.solution
 
-    def find_valid_neighbours(self, cell):
-        """Return a list of unvisited neighbours to cell."""
 
-        neighbours = []
-        for direction, (dx, dy) in Cell.delta.items():
-            x2, y2 = cell.x + dx, cell.y + dy
-            if (0 <= x2 < self.nx) and (0 <= y2 < self.ny):
-                neighbour = self.cell_at(x2, y2)
-                if neighbour.has_all_walls():
-                    neighbours.append((direction, neighbour))
-        return neighbours
+    def solve(self, start=None, end=None, method='bfs'):
+        """Find and store the path from start to end through the maze.
 
+        start and end are (x, y) cells, by default the maze's beginning and
+        end; method is 'bfs' or 'astar' (see solver.solve).
 
-    def get_solution(self):
+        """
+
+        from solver import solve
+        self.solution = solve(self.walls, start or self.begin,
+                              end or self.end, method)
         return self.solution
 
 
-    def make_maze(self):
+    def distances(self, source=None):
+        """Return the distance of each cell from source along the passages.
+
+        source defaults to the maze's beginning.
+
+        """
+
+        from solver import distance_field
+        return distance_field(self.walls, source or self.begin)
+
+
+    def place_by_distance(self):
+        """Place the beginning, end and treasure of the maze by distance.
+
+        The beginning and end are placed at either end of the longest path
+        through the maze (since it is a tree, this is found from the cell
+        farthest from an arbitrary one), and the treasure at the cell which
+        is farthest from both of them. The solution is updated to match, and
+        the entrance and exit openings in the maze's border are moved to the
+        beginning and end (a cell which isn't on the border gets none).
+
+        """
+
+        from solver import path_from_distances
+
+        def farthest(dist):
+            y, x = np.unravel_index(np.argmax(dist), dist.shape)
+            return int(x), int(y)
+
+        self.begin = farthest(self.distances((self.ix, self.iy)))
+        dist_begin = self.distances(self.begin)
+        self.end = farthest(dist_begin)
+        dist_end = self.distances(self.end)
+        self.treasure_x, self.treasure_y = farthest(np.minimum(dist_begin,
+                                                               dist_end))
+        self.solution = path_from_distances(self.walls, dist_begin, self.end)
+        self.excluded_walls = [wall for wall in (self.border_wall(*self.begin),
+                                                 self.border_wall(*self.end))
+                               if wall is not None]
+
+    def border_wall(self, x, y):
+        """Return a wall of cell (x,y) on the maze's border, or None.
+
+        The wall is given as a ((x1, y1), (x2, y2)) pair, as in
+        excluded_walls.
+
+        """
+
+        nx, ny = self.nx, self.ny
+        if x == 0:
+            return (0, y), (0, y+1)
+        if x == nx-1:
+            return (nx, y), (nx, y+1)
+        if y == 0:
+            return (x, 0), (x+1, 0)
+        if y == ny-1:
+            return (x, ny), (x+1, ny)
+        return None
+
+
+    def make_maze(self, algorithm='dfs', rng=None):
+        """Carve out the maze with the named algorithm.
+
+        The default, 'dfs', is a randomized depth-first search (the
+        "recursive backtracker") from the entry cell; the alternatives,
+        'kruskal', 'wilson' and 'eller', are defined in generators.py. These
+        draw their random numbers from the NumPy Generator rng, if given.
+        Only the depth-first search stores the solution to the maze.
+
+        """
+
+        if algorithm != 'dfs':
+            from generators import GENERATORS
+            self.solution = None
+            return GENERATORS[algorithm](self, rng)
+        self._make_dfs_maze()
+
+    def _make_dfs_maze(self):
+        """Carve out the maze by randomized depth-first search.
+
+        Rather than keep a stack of cells, each cell records the direction
+        back to the cell it was reached from in the upper bits of its walls
+        entry, and a bitmap records which cells have been visited, so the
+        working memory is only about 1/8 byte per cell over the walls array.
+
+        """
+
+        nx, ny = self.nx, self.ny
         # Total number of cells.
-        n = self.nx * self.ny
-        cell_stack = []
-        current_cell = self.cell_at(self.ix, self.iy)
+        n = nx * ny
+        # Work on the flattened walls array, indexed by i = y*nx + x, through
+        # a memoryview, which is much faster to index than the array itself.
+        walls = memoryview(self.walls.reshape(-1))
+        visited = bytearray((n + 7) // 8)
+        # The (wall, wall of neighbour, index offset to neighbour) for each
+        # direction, indexed by a direction code 0-3 that is stored in bits
+        # 4-5 of a cell's walls entry to point back to the preceding cell.
+        moves = ((N, S, -nx), (S, N, nx), (E, W, 1), (W, E, -1))
+        back = (1, 0, 3, 2)
+
+        current = self.iy * nx + self.ix
+        visited[current >> 3] |= 1 << (current & 7)
         # Total number of visited cells during maze construction.
         nv = 1
 
         while nv < n:
-            neighbours = self.find_valid_neighbours(current_cell)
+            x, y = current % nx, current // nx
+            neighbours = []
+            for code, ok in enumerate((y > 0, y < ny-1, x < nx-1, x > 0)):
+                if ok:
+                    i = current + moves[code][2]
+                    if not visited[i >> 3] & (1 << (i & 7)):
+                        neighbours.append((code, i))
 
             if not neighbours:
                 # We've reached a dead end: backtrack.
-                current_cell = cell_stack.pop()
+                code = walls[current] >> 4
+                current += moves[code][2]
                 continue
 
             # Choose a random neighbouring cell and move to it.
-            direction, next_cell = random.choice(neighbours)
-            current_cell.knock_down_wall(next_cell, direction)
-            cell_stack.append(current_cell)
-            current_cell = next_cell
-            
-            # Store the solution if we are at the exit cell
-            if (current_cell.x == self.nx - 1) and \
-               (current_cell.y == self.ny - 1):
-                self.solution = cell_stack.copy()
-                self.solution.append(next_cell)
+            code, i = random.choice(neighbours)
+            wall, other_wall, _ = moves[code]
+            walls[current] &= ~wall
+            walls[i] = (walls[i] & ~other_wall) | (back[code] << 4)
+            visited[i >> 3] |= 1 << (i & 7)
+            current = i
             nv += 1
+
+        # The solution is the path back from the exit cell to the entry
+        # cell by way of the stored directions: walk it once to find its
+        # length, and again to fill in its (x, y) coordinates, from the end.
+        start = self.iy * nx + self.ix
+        i, npts = n - 1, 1
+        while i != start:
+            i += moves[walls[i] >> 4][2]
+            npts += 1
+        self.solution = np.empty((npts, 2), dtype=np.int32)
+        solution = memoryview(self.solution.reshape(-1))
+        i = n - 1
+        for k in range(npts - 1, -1, -1):
+            solution[2*k], solution[2*k+1] = i % nx, i // nx
+            if k:
+                i += moves[walls[i] >> 4][2]
+
+        # Clear the back-pointers, leaving only the walls.
+        self.walls &= ALL_WALLS
@@ -0,0 +1,233 @@
+# generators.py
+import random
+from itertools import chain
+import numpy as np
+
+from df_maze import (N, S, E, W, ALL_WALLS, SVG_STYLE, text_rows,
+                     line_masks, mask_segments)
+from svg_writer import SVGWriter
+
+# Alternative algorithms for carving out a Maze, besides the depth-first
+# search of Maze.make_maze. Each takes a Maze, whose walls array it carves in
+# place, and an optional NumPy random Generator; by default this is seeded
+# from the random module, so random.seed makes the mazes reproducible.
+
+def _get_rng(rng):
+    """Return rng or, if it is None, a new Generator seeded from random."""
+
+    if rng is None:
+        return np.random.default_rng(random.getrandbits(64))
+    return rng
+
+def _random_codes(rng, n=65536):
+    """Yield an endless stream of random direction codes, 0-3."""
+
+    return chain.from_iterable(iter(lambda: rng.integers(0, 4, n).tolist(),
+                                    None))
+
+def kruskal(maze, rng=None):
+    """Carve out maze with the randomized Kruskal's algorithm.
+
+    Every interior wall is considered once in random order and knocked down
+    if the cells on either side of it are not already connected, as tracked
+    by a union-find structure held in an array of parent cell indexes.
+
+    """
+
+    rng = _get_rng(rng)
+    nx, ny = maze.nx, maze.ny
+    n = nx * ny
+    walls = memoryview(maze.walls.reshape(-1))
+    parent = memoryview(np.arange(n, dtype=np.int64))
+
+    def find(i):
+        # Find the root of i's tree, halving the path to it as we go.
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Each interior wall is labelled 2*i for the East wall of cell i and
+    # 2*i + 1 for its South wall.
+    i = np.arange(n).reshape(ny, nx)
+    edges = np.concatenate((2 * i[:, :-1].ravel(), 2 * i[:-1].ravel() + 1))
+    rng.shuffle(edges)
+
+    nknocked = 0
+    for edge in edges.tolist():
+        i = edge >> 1
+        j = i + (nx if edge & 1 else 1)
+        ri, rj = find(i), find(j)
+        if ri == rj:
+            continue
+        parent[rj] = ri
+        if edge & 1:
+            walls[i] &= ~S
+            walls[j] &= ~N
+        else:
+            walls[i] &= ~E
+            walls[j] &= ~W
+        nknocked += 1
+        if nknocked == n - 1:
+            # The maze is a spanning tree: no further walls can be removed.
+            break
+
+def wilson(maze, rng=None):
+    """Carve out maze with Wilson's algorithm.
+
+    Starting from a random cell, the maze is grown by loop-erased random
+    walks from each cell not yet in it, giving a maze chosen uniformly from
+    all possible spanning trees of the grid. Only the last direction taken
+    out of each cell during a walk is stored, which erases any loops.
+
+    """
+
+    rng = _get_rng(rng)
+    nx, ny = maze.nx, maze.ny
+    n = nx * ny
+    walls = memoryview(maze.walls.reshape(-1))
+    in_maze = bytearray(n)
+    direction = bytearray(n)
+    # The (wall, wall of neighbour, index offset) for direction codes 0-3.
+    moves = ((N, S, -nx), (S, N, nx), (E, W, 1), (W, E, -1))
+    codes = _random_codes(rng)
+
+    in_maze[int(rng.integers(n))] = 1
+    for start in range(n):
+        # Random walk from start until the walk hits the maze.
+        i = start
+        while not in_maze[i]:
+            x, y = i % nx, i // nx
+            valid = (y > 0, y < ny-1, x < nx-1, x > 0)
+            code = next(codes)
+            while not valid[code]:
+                code = next(codes)
+            direction[i] = code
+            i += moves[code][2]
+
+        # Retrace the loop-erased walk, adding it to the maze.
+        i = start
+        while not in_maze[i]:
+            wall, other_wall, offset = moves[direction[i]]
+            walls[i] &= ~wall
+            walls[i + offset] &= ~other_wall
+            in_maze[i] = 1
+            i += offset
+
+def eller_rows(nx, ny, rng=None, p_join=0.5, p_down=0.5):
+    """Generate a maze row by row with Eller's algorithm.
+
+    Yield the walls of each of the ny rows of an nx-wide maze in turn, as an
+    array of nx wall bit flags. Only the current row and its cells' set
+    labels are held, so the memory used is proportional to nx and the maze
+    can be streamed to output without ever being stored. Adjacent cells in
+    different sets are joined with probability p_join, and each cell is
+    connected to the row below with probability p_down (but each set is
+    connected down at least once). The last row joins all remaining sets.
+
+    """
+
+    rng = _get_rng(rng)
+    labels = np.arange(nx)
+    north = np.zeros(nx, dtype=bool)
+    for y in range(ny):
+        last = y == ny - 1
+        row = np.full(nx, ALL_WALLS, dtype=np.uint8)
+        row[north] &= ALL_WALLS ^ N
+
+        # Join adjacent cells in different sets, tracking the merges with a
+        # union-find over the labels (which are always less than nx).
+        parent = list(range(nx))
+
+        def find(a):
+            while parent[a] != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            return a
+
+        join = np.ones(nx-1, dtype=bool) if last else rng.random(nx-1) < p_join
+        row_labels = labels.tolist()
+        for x in np.nonzero(join)[0].tolist():
+            a, b = find(row_labels[x]), find(row_labels[x+1])
+            if a != b:
+                parent[b] = a
+                row[x] &= ALL_WALLS ^ E
+                row[x+1] &= ALL_WALLS ^ W
+        # Resolve every label to the root of its set by pointer jumping.
+        parent = np.array(parent)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        labels = parent[labels]
+
+        if not last:
+            # Connect cells down to the next row at random, but at least one
+            # cell (the first in a random order) of every set.
+            down = rng.random(nx) < p_down
+            order = rng.permutation(nx)
+            _, first = np.unique(labels[order], return_index=True)
+            down[order[first]] = True
+            row[down] &= ALL_WALLS ^ S
+            north = down
+            # Cells not connected down start new sets in the next row.
+            _, labels = np.unique(np.where(down, labels, nx + np.arange(nx)),
+                                  return_inverse=True)
+        yield row
+
+def eller(maze, rng=None):
+    """Carve out maze with Eller's algorithm."""
+
+    for y, row in enumerate(eller_rows(maze.nx, maze.ny, rng)):
+        maze.walls[y] = row
+
+def _bands(rows, band):
+    """Collect an iterable of rows into (y0, array) bands of band rows."""
+
+    y0, buf = 0, []
+    for row in rows:
+        buf.append(row)
+        if len(buf) == band:
+            yield y0, np.array(buf)
+            y0, buf = y0 + band, []
+    if buf:
+        yield y0, np.array(buf)
+
+def write_text(f, nx, rows, band=256):
+    """Write the text picture of a maze from an iterable of rows to f.
+
+    rows yields the walls of each row of an nx-wide maze (for example, from
+    eller_rows); they are written band rows at a time.
+
+    """
+
+    print('-' * nx * 2, file=f)
+    for _, walls in _bands(rows, band):
+        print('\n'.join(text_rows(walls)), file=f)
+
+def write_svg(filename, nx, ny, rows, cell_size=10, band=256):
+    """Write an SVG image of a maze from an iterable of rows to filename.
+
+    rows yields the walls of each of the ny rows of an nx-wide maze (for
+    example, from eller_rows); each band of rows is written as its own path
+    so the whole maze is never held in memory. The cells are drawn with side
+    cell_size pixels and, as for Maze.write_svg, the maze is entered at the
+    top left and exited at the bottom right.
+
+    """
+
+    padding = 10
+    width, height = nx * cell_size, ny * cell_size
+    excluded = [((0, 0), (0, 1)), ((nx-1, ny), (nx, ny))]
+    with SVGWriter(filename, width + 2 * padding, height + 2 * padding,
+                   view_box=(-padding, -padding, width + 2 * padding,
+                             height + 2 * padding), style=SVG_STYLE) as svg:
+        for y0, walls in _bands(rows, band):
+            h, v = line_masks(walls, excluded, y0)
+            if y0:
+                # The line above this band was drawn with the last band.
+                h[0] = False
+            svg.segments(*(mask_segments(h, v, y0) * cell_size))
+
+GENERATORS = {'kruskal': kruskal, 'wilson': wilson, 'eller': eller}
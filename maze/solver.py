@@ -0,0 +1,119 @@
+# solver.py
+import heapq
+import numpy as np
+
+from df_maze import N, S, E, W
+
+# Solve mazes, given as (ny, nx) arrays of wall bit flags (as Maze.walls),
+# between any two cells, and calculate the distances of every cell from a
+# source cell along the passages of a maze.
+
+def _moves(nx):
+    """Return the (wall, flat index offset) for each direction in a maze."""
+
+    return ((N, -nx), (S, nx), (E, 1), (W, -1))
+
+def distance_field(walls, source):
+    """Return the array of distances of each cell from source, an (x, y) pair.
+
+    The distances are calculated by a breadth-first search a frontier at a
+    time: the frontier is held as an array of cell indexes and advanced
+    through all the open walls of all of its cells at once. Unreachable
+    cells have distance -1.
+
+    """
+
+    ny, nx = walls.shape
+    flat_walls = walls.reshape(-1)
+    dist = np.full(nx * ny, -1, dtype=np.int32)
+    frontier = np.array([source[1] * nx + source[0]])
+    dist[frontier] = d = 0
+    while len(frontier):
+        d += 1
+        cell_walls = flat_walls[frontier]
+        # Neighbours through each open wall; the maze border is walled, so
+        # these never leave the grid.
+        frontier = np.concatenate([frontier[(cell_walls & wall) == 0] + offset
+                                   for wall, offset in _moves(nx)])
+        frontier = frontier[dist[frontier] < 0]
+        # In a maze with loops a cell can be reached from several cells of
+        # the frontier: keep one copy of each, by scattering the positions
+        # of the copies into dist and keeping the copy whose position landed.
+        k = -2 - np.arange(len(frontier), dtype=np.int32)
+        dist[frontier] = k
+        frontier = frontier[dist[frontier] == k]
+        dist[frontier] = d
+    return dist.reshape(ny, nx)
+
+def path_from_distances(walls, dist, end):
+    """Return the path from the source of the distance field dist to end.
+
+    The path, found by stepping back from end to an open neighbour one step
+    closer to the source each time, is returned as an (npts, 2) array of
+    (x, y) coordinates, or None if end can't be reached.
+
+    """
+
+    ny, nx = walls.shape
+    flat_walls = memoryview(np.ascontiguousarray(walls).reshape(-1))
+    flat_dist = memoryview(np.ascontiguousarray(dist).reshape(-1))
+    i = end[1] * nx + end[0]
+    if flat_dist[i] < 0:
+        return None
+    path = [i]
+    for d in range(flat_dist[i] - 1, -1, -1):
+        for wall, offset in _moves(nx):
+            if not flat_walls[i] & wall and flat_dist[i + offset] == d:
+                i += offset
+                break
+        path.append(i)
+    path = np.array(path[::-1])
+    return np.column_stack((path % nx, path // nx))
+
+def astar(walls, start, end):
+    """Return the path from start to end found by A* search, or None.
+
+    The heuristic is the Manhattan distance to end, which never overestimates
+    the distance along the passages. The path is returned as an (npts, 2)
+    array of (x, y) coordinates.
+
+    """
+
+    ny, nx = walls.shape
+    flat_walls = memoryview(np.ascontiguousarray(walls).reshape(-1))
+    moves = _moves(nx)
+    ex, ey = end
+    i0, iend = start[1] * nx + start[0], ey * nx + ex
+    came_from = {i0: None}
+    cost = {i0: 0}
+    queue = [(0, i0)]
+    while queue:
+        _, i = heapq.heappop(queue)
+        if i == iend:
+            path = []
+            while i is not None:
+                path.append(i)
+                i = came_from[i]
+            path = np.array(path[::-1])
+            return np.column_stack((path % nx, path // nx))
+        for wall, offset in moves:
+            if flat_walls[i] & wall:
+                continue
+            j, c = i + offset, cost[i] + 1
+            if c < cost.get(j, c + 1):
+                cost[j], came_from[j] = c, i
+                h = abs(j % nx - ex) + abs(j // nx - ey)
+                heapq.heappush(queue, (c + h, j))
+    return None
+
+def solve(walls, start, end, method='bfs'):
+    """Return the path from start to end through the maze walls.
+
+    method is 'bfs', a breadth-first search giving the distance field from
+    start, or 'astar', which visits fewer cells but runs in Python.
+
+    """
+
+    if method == 'astar':
+        return astar(walls, start, end)
+    return path_from_distances(walls, distance_field(walls, start), end)
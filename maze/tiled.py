@@ -0,0 +1,98 @@
+# tiled.py
+import random
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from df_maze import Maze, S, E, N, W, ALL_WALLS
+
+# Generate large mazes in parallel: the grid is split into rectangular tiles,
+# each tile is carved into a maze of its own by a separate process, and the
+# tiles are then joined by opening one wall between each pair of tiles
+# adjacent in a random spanning tree of the grid of tiles. Since the tiles'
+# mazes are spanning trees, so is the result: it is still a perfect maze.
+
+def _make_tile(nx, ny, algorithm, seed):
+    """Return the walls array of an nx x ny maze carved with its own RNG."""
+
+    # Seed both the random module (for the depth-first search) and a NumPy
+    # Generator (for the other algorithms) from this tile's seed.
+    random.seed(seed)
+    tile = Maze(nx, ny)
+    tile.make_maze(algorithm, np.random.default_rng(seed))
+    return tile.walls
+
+def _tile_tree(mx, my, rng):
+    """Return the edges of a random spanning tree of an mx x my tile grid.
+
+    Each edge is (tx, ty, direction), joining the tile at (tx, ty) to its
+    neighbour to the East ('E') or South ('S').
+
+    """
+
+    edges = [(tx, ty, 'E') for ty in range(my) for tx in range(mx-1)]
+    edges += [(tx, ty, 'S') for ty in range(my-1) for tx in range(mx)]
+    order = rng.permutation(len(edges))
+    parent = list(range(mx * my))
+
+    def find(a):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    tree = []
+    for k in order.tolist():
+        tx, ty, direction = edges[k]
+        a = ty * mx + tx
+        b = a + (1 if direction == 'E' else mx)
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+            tree.append(edges[k])
+    return tree
+
+def make_tiled_maze(maze, tile=(256, 256), algorithm='kruskal', seed=None,
+                    max_workers=None):
+    """Carve out maze in parallel, a tile of (tile_nx, tile_ny) cells at a time.
+
+    Each tile is carved with the named algorithm (see Maze.make_maze) in a
+    pool of max_workers processes, with a random number generator seeded
+    from its own child of a SeedSequence created from seed, so the maze is
+    reproducible for a given seed and tile size whatever the number of
+    workers. The tiles are then joined along a random spanning tree of the
+    tile grid.
+
+    """
+
+    tnx, tny = tile
+    nx, ny = maze.nx, maze.ny
+    x0s, y0s = range(0, nx, tnx), range(0, ny, tny)
+    mx, my = len(x0s), len(y0s)
+    seq = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seq.spawn(1)[0])
+    tile_seeds = [int(s.generate_state(1)[0]) for s in seq.spawn(mx * my)]
+
+    tiles = [(x0, y0) for y0 in y0s for x0 in x0s]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_make_tile, min(tnx, nx - x0),
+                                   min(tny, ny - y0), algorithm, tile_seed)
+                   for (x0, y0), tile_seed in zip(tiles, tile_seeds)]
+        for (x0, y0), future in zip(tiles, futures):
+            walls = future.result()
+            maze.walls[y0:y0 + walls.shape[0], x0:x0 + walls.shape[1]] = walls
+
+    # Join the tiles: for each edge of the tile tree, knock down a randomly
+    # chosen wall along the boundary between the two tiles.
+    for tx, ty, direction in _tile_tree(mx, my, rng):
+        x0, y0 = x0s[tx], y0s[ty]
+        if direction == 'E':
+            x = min(x0 + tnx, nx) - 1
+            y = int(rng.integers(y0, min(y0 + tny, ny)))
+            maze.walls[y, x] &= ALL_WALLS ^ E
+            maze.walls[y, x+1] &= ALL_WALLS ^ W
+        else:
+            x = int(rng.integers(x0, min(x0 + tnx, nx)))
+            y = min(y0 + tny, ny) - 1
+            maze.walls[y, x] &= ALL_WALLS ^ S
+            maze.walls[y+1, x] &= ALL_WALLS ^ N
+    maze.solution = None
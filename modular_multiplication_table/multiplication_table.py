@@ -1,14 +1,25 @@
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.ticker import FuncFormatter
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from png_writer import write_png
+
 # Create a colour-coded multiplication table based on modular arithmetic.
 # The maths behind this code is described in the scipython blog article at
 # https://scipython.com/blog/visulaizing-modular-multiplication-tables/
 # Christian Hill, May 2016.
 
+# Tables with more than this many entries are written by the tiled engine.
+MAX_IN_MEMORY = 2**24
+# Build a full colour lookup table only for moduli up to this size.
+MAX_LUT_SIZE = 2**20
+
 def multiplication_table(n, N=None, number_labels=True):
     """Create and plot an image of a multiplication table modulo n
 
@@ -23,7 +34,7 @@ def multiplication_table(n, N=None, number_labels=True):
         N=n
 
     # A multiplication table (modulo n)
-    arr = np.fromfunction(lambda i,j:(i+1)*(j+1) % n, (N-1,N-1))
+    arr = table(n, N)
 
     # Select a colormap, but we'll set 0 values to white
     cmap = matplotlib.cm.get_cmap('rainbow')
@@ -46,14 +57,226 @@ def multiplication_table(n, N=None, number_labels=True):
                 ax.annotate(s=str((i+1)*(j+1)%n), xy=(i,j), ha='center',
                             va='center')
 
-# The user supplies n (and optionally N) as command line arguments
-n = int(sys.argv[1])
-try:
-    N = int(sys.argv[2])
-except IndexError:
-    N = None
-
-number_labels = False
-multiplication_table(n, N, number_labels)
-plt.savefig('modmult-{}-{}.png'.format(N if N else n, n))
-plt.show()
+def table_dtype(n):
+    """Return the smallest unsigned integer dtype holding 0, 1, ..., n-1."""
+
+    return np.min_scalar_type(n - 1)
+
+def table_block(n, i0, i1, j0, j1):
+    """Return the block arr[i0:i1, j0:j1] of the table (i+1)(j+1) % n.
+
+    Each factor is first reduced modulo n, so the products are formed in the
+    smallest integer type that can hold (n-1)^2 and the block returned in the
+    smallest type that can hold n-1, whatever the size of the table.
+
+    """
+
+    prod_dtype = np.min_scalar_type((n - 1)**2)
+    a = (np.arange(i0 + 1, i1 + 1) % n).astype(prod_dtype)
+    b = (np.arange(j0 + 1, j1 + 1) % n).astype(prod_dtype)
+    block = np.multiply.outer(a, b)
+    block %= n
+    return block.astype(table_dtype(n))
+
+def period_table(n, m=None, tile=2048):
+    """Return the table (i+1)(j+1) % n for i, j = 0, 1, ..., m-1.
+
+    m defaults to n, giving one full period of the table. The table is
+    symmetric, so only the blocks (of at most tile x tile entries) on and
+    above its diagonal are calculated: those below are their transposes.
+
+    """
+
+    if m is None:
+        m = n
+    arr = np.empty((m, m), dtype=table_dtype(n))
+    for i0 in range(0, m, tile):
+        i1 = min(i0 + tile, m)
+        for j0 in range(i0, m, tile):
+            j1 = min(j0 + tile, m)
+            arr[i0:i1, j0:j1] = table_block(n, i0, i1, j0, j1)
+            if j0 != i0:
+                arr[j0:j1, i0:i1] = arr[i0:i1, j0:j1].T
+    return arr
+
+def tiled_view(arr, reps):
+    """Return a read-only (reps, m, reps, m) view repeating the m x m arr.
+
+    The view shares arr's memory: element [I, i, J, j] is arr[i, j] for
+    every repetition I, J of the pattern.
+
+    """
+
+    m = arr.shape[0]
+    return np.lib.stride_tricks.as_strided(arr, shape=(reps, m, reps, m),
+                        strides=(0, arr.strides[0], 0, arr.strides[1]),
+                        writeable=False)
+
+def table(n, N=None):
+    """Return the table ij % n for i, j = 1, 2, ..., N-1.
+
+    Only the upper triangle of a single period of the table is calculated;
+    the full table is assembled from a tiled view of it.
+
+    """
+
+    if not N:
+        N = n
+    M = N - 1
+    if M <= n:
+        return period_table(n, M)
+    reps = -(-M // n)
+    arr = tiled_view(period_table(n), reps).reshape(reps * n, reps * n)
+    return arr[:M, :M]
+
+def colour_lut(n, cmap='rainbow'):
+    """Return an (n, 3) uint8 array of the RGB colour for each value mod n.
+
+    Values 1 to n-1 are mapped onto cmap as by imshow with vmin=1 and zero is
+    mapped to white.
+
+    """
+
+    cmap = plt.get_cmap(cmap)
+    norm = matplotlib.colors.Normalize(vmin=1, vmax=max(n - 1, 2))
+    lut = cmap(norm(np.arange(n)), bytes=True)[:, :3]
+    lut[0] = 255
+    return lut
+
+def colour_block(block, n, lut=None, cmap='rainbow'):
+    """Map a block of table values to RGB through the colour lookup table.
+
+    If lut is None (for very large n), the colours are calculated directly.
+
+    """
+
+    if lut is not None:
+        return lut[block]
+    cmap = plt.get_cmap(cmap)
+    norm = matplotlib.colors.Normalize(vmin=1, vmax=n - 1)
+    rgb = cmap(norm(block), bytes=True)[..., :3]
+    rgb[block == 0] = 255
+    return rgb
+
+def table_stripes(n, N=None, tile=2048, cmap='rainbow'):
+    """Yield the RGB image of the table ij % n in horizontal stripes.
+
+    The table is calculated and colour-mapped in blocks of at most tile x tile
+    entries, and each stripe has at most about tile^2 pixels (but is at least
+    one row high), so the memory used depends on tile and not on N.
+
+    If one period of the table is small enough to be held in memory and is
+    repeated across the image (N-1 > n), it is calculated and coloured once
+    and each stripe broadcast from its rows.
+
+    """
+
+    if not N:
+        N = n
+    M = N - 1
+    lut = colour_lut(n, cmap) if n <= MAX_LUT_SIZE else None
+    nrows = max(1, tile * tile // M)
+
+    if M > n and n * n <= MAX_IN_MEMORY:
+        period_rgb = colour_block(period_table(n, tile=tile), n, lut, cmap)
+        reps = -(-M // n)
+        for i0 in range(0, M, nrows):
+            rows = period_rgb[np.arange(i0, min(i0 + nrows, M)) % n]
+            stripe = np.broadcast_to(rows[:, None], (len(rows), reps, n, 3))
+            yield stripe.reshape(len(rows), reps * n, 3)[:, :M]
+        return
+
+    for i0 in range(0, M, nrows):
+        i1 = min(i0 + nrows, M)
+        stripe = np.empty((i1 - i0, M, 3), dtype=np.uint8)
+        for j0 in range(0, M, tile):
+            j1 = min(j0 + tile, M)
+            stripe[:, j0:j1] = colour_block(table_block(n, i0, i1, j0, j1), n,
+                                            lut, cmap)
+        yield stripe
+
+def write_table_png(filename, n, N=None, tile=2048, cmap='rainbow'):
+    """Stream a PNG image of the table ij % n, i, j = 1, ..., N-1 to disk.
+
+    Each pixel is one table entry, coloured as by multiplication_table.
+
+    """
+
+    if not N:
+        N = n
+    write_png(filename, N - 1, N - 1, table_stripes(n, N, tile, cmap))
+
+# The product grid ij for i, j = 1, 2, ..., N-1, shared by each sweep worker.
+_products = None
+
+def _init_sweep(N):
+    """Calculate the product grid once in each sweep worker process."""
+
+    global _products
+    i = np.arange(1, N, dtype=np.min_scalar_type((N - 1)**2))
+    _products = np.multiply.outer(i, i)
+
+def _render_frames(frames, filename_template, scale, cmap):
+    """Write the images of the tables ij % n for each (frame number, n)."""
+
+    frame = np.empty_like(_products)
+    filenames = []
+    for i, n in frames:
+        np.remainder(_products, n, out=frame)
+        rgb = colour_lut(n, cmap)[frame]
+        if scale > 1:
+            rgb = rgb.repeat(scale, axis=0).repeat(scale, axis=1)
+        filename = filename_template.format(i=i, n=n)
+        write_png(filename, rgb.shape[1], rgb.shape[0], [rgb])
+        filenames.append(filename)
+    return filenames
+
+def sweep(ns, N, filename_template='modmult-{i:05d}.png', scale=1,
+          cmap='rainbow', chunksize=8, max_workers=None):
+    """Write numbered images of the tables ij % n, i, j < N, for each n in ns.
+
+    The products ij are calculated once per worker process and each frame
+    derived from them with a single vectorized remainder operation and
+    coloured through its lookup table. The frames are written, scale pixels
+    per table entry, to files named by filename_template (which may refer to
+    the frame number, i, and modulus, n) in a pool of max_workers processes.
+    Return the list of filenames written.
+
+    """
+
+    frames = list(enumerate(ns))
+    chunks = [frames[k:k+chunksize] for k in range(0, len(frames), chunksize)]
+    filenames = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep,
+                             initargs=(N,)) as executor:
+        futures = [executor.submit(_render_frames, chunk, filename_template,
+                                   scale, cmap) for chunk in chunks]
+        for future in futures:
+            filenames.extend(future.result())
+    return filenames
+
+if __name__ == '__main__':
+    # The user supplies n (and optionally N) as command line arguments. A
+    # range of n, given as start:stop[:step], writes the frames of a sweep
+    # over those moduli for a fixed table size N instead.
+    if ':' in sys.argv[1]:
+        ns = range(*(int(v) for v in sys.argv[1].split(':')))
+        sweep(ns, int(sys.argv[2]))
+        sys.exit()
+
+    n = int(sys.argv[1])
+    try:
+        N = int(sys.argv[2])
+    except IndexError:
+        N = None
+
+    filename = 'modmult-{}-{}.png'.format(N if N else n, n)
+    if (N or n)**2 > MAX_IN_MEMORY:
+        # Too big to plot: stream the image to disk, a stripe at a time.
+        write_table_png(filename, n, N)
+        sys.exit()
+
+    number_labels = False
+    multiplication_table(n, N, number_labels)
+    plt.savefig(filename)
+    plt.show()
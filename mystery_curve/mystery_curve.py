@@ -1,6 +1,9 @@
 import sys
-import matplotlib.pyplot as plt
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+from matplotlib import colors
+from matplotlib import image
 
 # Create a pleasing curve in the complex plane based on the formula
 # f(t) = e^(it)[1 - e^(ikt)/2 + i.e^(-ikt)/3].
@@ -8,6 +11,10 @@ import numpy as np
 # article at https://scipython.com/blog/the-mystery-curve/
 # Christian Hill, May 2016.
 
+# The coefficients of the Laurent polynomial P(z) = sum_p c_p z^p used by
+# the original Mystery Curve, as a mapping {p: c_p}: 1 - z/2 - 1/z^3/3i.
+MYSTERY_COEFFS = {0: 1, 1: -1/2, -3: 1j/3}
+
 def f(t, k):
     """Return the "Mystery Curve" for parameter k on a grid of t values."""
 
@@ -15,21 +22,157 @@ def f(t, k):
         return 1 - z / 2 - 1 / z**3 / 3j
     return np.exp(1j*t) * P(np.exp(k*1j*t))
 
-# k is supplied as a command line argument.
-k = int(sys.argv[1])
+@lru_cache(maxsize=8)
+def base_grid(M):
+    """Return exp(it) on the grid t = 2.pi.j/M, j = 0, 1, ..., M.
+
+    The array is cached (and made read-only) so that batches of curves
+    sharing the same resolution don't recalculate it.
+
+    """
+
+    w = np.exp(2j * np.pi * np.arange(M+1) / M)
+    w.flags.writeable = False
+    return w
+
+def curves(ks, coeffs=MYSTERY_COEFFS, M=None):
+    """Return the curves e^(it).P(e^(ikt)) for each k in ks as a 2D array.
+
+    coeffs is a mapping {p: c_p} of the powers and coefficients of the
+    Laurent polynomial P(z). The curves are evaluated on a common grid of
+    M+1 values of t between 0 and 2.pi (by default, 200 per unit of the
+    largest k) and returned as the rows of a complex array. Since t is
+    sampled at the Mth roots of unity, every power e^(ipkt) is simply a
+    lookup into the cached base grid, exp(it), so no further complex
+    exponentials need be calculated.
+
+    """
+
+    ks = np.atleast_1d(np.asarray(ks, dtype=int))
+    if M is None:
+        M = 200 * max(1, np.abs(ks).max())
+    w = base_grid(M)
+    j = np.arange(M+1)
+    kj = np.outer(ks, j)
+    P = np.zeros(kj.shape, dtype=complex)
+    for p, c in coeffs.items():
+        P += c * w[(p * kj) % M]
+    return w * P
+
+def rasterize(u, size=480, lw=2, colour='m', alpha=0.5, pad=0.05):
+    """Rasterize the curve u to a (size, size, 3) uint8 RGB image array.
+
+    The curve is scaled to fit the image with equal aspect ratio (and a
+    fractional padding, pad) and drawn with a line width of lw pixels in
+    colour on a white background, without going through a Figure.
+
+    """
+
+    x, y = np.real(u), np.imag(u)
+    xmin, xmax, ymin, ymax = x.min(), x.max(), y.min(), y.max()
+    scale = (1 - 2*pad) * (size - 1) / max(xmax - xmin, ymax - ymin, 1e-12)
+    # Pixel coordinates of the curve's points, centred in the image; the
+    # image y-axis points down.
+    px = (x - (xmin + xmax)/2) * scale + (size - 1)/2
+    py = (size - 1)/2 - (y - (ymin + ymax)/2) * scale
+
+    # Subdivide each segment so that no step is longer than half a pixel.
+    seglen = np.hypot(np.diff(px), np.diff(py))
+    m = max(1, int(np.ceil(seglen.max() * 2)))
+    s = np.arange(m) / m
+    px = (px[:-1, None] + np.diff(px)[:, None] * s).ravel()
+    py = (py[:-1, None] + np.diff(py)[:, None] * s).ravel()
+    ix = np.clip(np.rint(px).astype(int), 0, size - 1)
+    iy = np.clip(np.rint(py).astype(int), 0, size - 1)
+    hits = np.bincount(iy * size + ix, minlength=size*size) > 0
+    hits = hits.reshape(size, size)
+
+    # Thicken the one-pixel line by dilating with a disc of diameter lw.
+    rad = max(0, int(np.ceil((lw - 1) / 2)))
+    mask = np.zeros((size + 2*rad, size + 2*rad), dtype=bool)
+    for dy in range(-rad, rad+1):
+        for dx in range(-rad, rad+1):
+            if dx*dx + dy*dy <= (lw/2)**2:
+                mask[rad+dy:rad+dy+size, rad+dx:rad+dx+size] |= hits
+    mask = mask[rad:rad+size, rad:rad+size]
+
+    # Blend the line colour with the white background.
+    rgb = np.asarray(colors.to_rgb(colour))
+    img = np.ones((size, size, 3))
+    img[mask] = 1 - alpha * (1 - rgb)
+    return (img * 255 + 0.5).astype(np.uint8)
+
+def _render_chunk(ks, coeffs, M, filename_template, size):
+    """Evaluate and rasterize a chunk of curves to image files."""
+
+    filenames = []
+    for k, u in zip(ks, curves(ks, coeffs, M)):
+        filename = filename_template.format(k=k)
+        image.imsave(filename, rasterize(u, size))
+        filenames.append(filename)
+    return filenames
+
+def batch(ks, coeffs=MYSTERY_COEFFS, filename_template='mystery_curve_{k}.png',
+          size=480, chunksize=16, max_workers=None, M=None):
+    """Render the Mystery Curve for each k in ks to an image file.
+
+    The curves are evaluated chunksize at a time as 2D arrays and rasterized
+    directly to image files named by filename_template in a pool of
+    max_workers processes. All the curves are evaluated on the same grid of
+    M+1 values of t (by default, 200 per unit of the largest k), so they
+    are drawn at the same resolution and each worker's base grid is reused
+    from its cache. Return the list of filenames written.
+
+    """
+
+    ks = list(ks)
+    if not ks:
+        return []
+    if M is None:
+        M = 200 * max(1, max(abs(k) for k in ks))
+    chunks = [ks[i:i+chunksize] for i in range(0, len(ks), chunksize)]
+    filenames = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_render_chunk, chunk, coeffs, M,
+                                   filename_template, size)
+                   for chunk in chunks]
+        for future in futures:
+            filenames.extend(future.result())
+    return filenames
+
+def parse_ks(s):
+    """Parse a list of k values such as "3", "3,6,20" or "1:100[:step]"."""
+
+    if ':' in s:
+        return range(*(int(v) for v in s.split(':')))
+    return [int(v) for v in s.split(',')]
 
-# Choose a grid of t values at a suitable resolution so that the curve.
-# is well-represented.
-t = np.linspace(0, 2*np.pi, 200*k+1);
+if __name__ == '__main__':
+    # k is supplied as a command line argument. A comma-separated list or
+    # a range start:stop[:step] of k values renders them all in batch mode.
+    # Further coefficients of P(z) may be given as power=coeff, e.g.
+    # python mystery_curve.py 1:500 0=1 1=-0.5 -3=0.333j
+    ks = parse_ks(sys.argv[1])
+    coeffs = dict(MYSTERY_COEFFS)
+    for arg in sys.argv[2:]:
+        p, c = arg.split('=')
+        coeffs[int(p)] = complex(c)
+    if len(ks) > 1:
+        batch(ks, coeffs)
+        sys.exit()
 
-u = f(t, k)
+    import matplotlib.pyplot as plt
 
-# Plot the Mystery Curve in a pleasing colour, removing the axis clutter.
-fig, ax = plt.subplots(facecolor='w')
-ax.plot(np.real(u), np.imag(u), lw=2, color='m', alpha=0.5)
-ax.set_aspect('equal')
-plt.axis('off')
+    k = ks[0]
+    # The curve is evaluated on a grid of t values at a suitable resolution
+    # (200 per unit of k) so that it is well-represented.
+    u = curves(k, coeffs)[0]
 
-plt.savefig('mystery_curve_{}.png'.format(k))
-plt.show()
+    # Plot the Mystery Curve in a pleasing colour, removing the axis clutter.
+    fig, ax = plt.subplots(facecolor='w')
+    ax.plot(np.real(u), np.imag(u), lw=2, color='m', alpha=0.5)
+    ax.set_aspect('equal')
+    plt.axis('off')
 
+    plt.savefig('mystery_curve_{}.png'.format(k))
+    plt.show()
@@ -0,0 +1,112 @@
+import struct
+import zlib
+import numpy as np
+
+# A minimal streaming PNG writer shared by the projects in this repository
+# which write images directly from NumPy arrays, without going through a
+# matplotlib Figure. The image is supplied as an iterable of horizontal
+# stripes, which are compressed and written as they arrive, so the whole
+# image never needs to be held in memory. Animated PNGs (APNG) can be
+# written a frame at a time in the same way.
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def _png_chunk(tag, data):
+    """Return the bytes of a PNG chunk with type tag and contents data."""
+
+    crc = zlib.crc32(tag + data) & 0xffffffff
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', crc)
+
+def _ihdr(width, height):
+    """Return the header chunk for an 8-bit RGB image."""
+
+    return _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height,
+                                           8, 2, 0, 0, 0))
+
+def _compressed(width, stripes, level):
+    """Yield the compressed image data for an iterable of row stripes."""
+
+    z = zlib.compressobj(level)
+    for stripe in stripes:
+        # Each row is preceded by its filter type byte (0: None).
+        raw = np.zeros((stripe.shape[0], 1 + width * 3), dtype=np.uint8)
+        raw[:, 1:] = stripe.reshape(stripe.shape[0], -1)
+        data = z.compress(raw.tobytes())
+        if data:
+            yield data
+    yield z.flush()
+
+def write_png(filename, width, height, stripes, level=6):
+    """Write an 8-bit RGB PNG image from an iterable of row stripes.
+
+    Each stripe is a (nrows, width, 3) uint8 array; the stripes are
+    compressed and written to filename as they arrive, so the whole image
+    is never held in memory.
+
+    """
+
+    with open(filename, 'wb') as fo:
+        fo.write(PNG_SIGNATURE)
+        fo.write(_ihdr(width, height))
+        for data in _compressed(width, stripes, level):
+            fo.write(_png_chunk(b'IDAT', data))
+        fo.write(_png_chunk(b'IEND', b''))
+
+class APNGWriter:
+    """Write an animated PNG image a frame at a time.
+
+    Each frame is a (height, width, 3) uint8 array, shown for delay ms; the
+    animation is played loops times (0: forever). Since the number of frames
+    isn't known until the writer is closed, the animation control chunk is
+    rewritten then, so filename must be a seekable file.
+
+    """
+
+    def __init__(self, filename, width, height, delay=100, loops=0,
+                 level=6):
+        self.width, self.height = width, height
+        self.delay, self.loops, self.level = delay, loops, level
+        self.nframes = 0
+        # The sequence number of the next fcTL or fdAT chunk.
+        self.seq = 0
+        self.fo = open(filename, 'wb')
+        self.fo.write(PNG_SIGNATURE)
+        self.fo.write(_ihdr(width, height))
+        self.actl_pos = self.fo.tell()
+        self.fo.write(self._actl())
+
+    def _actl(self):
+        return _png_chunk(b'acTL', struct.pack('>II', self.nframes,
+                                               self.loops))
+
+    def add_frame(self, rgb):
+        """Compress and write the frame rgb."""
+
+        fctl = struct.pack('>IIIIIHHBB', self.seq, self.width, self.height,
+                           0, 0, self.delay, 1000, 0, 0)
+        self.fo.write(_png_chunk(b'fcTL', fctl))
+        self.seq += 1
+        for data in _compressed(self.width, (rgb,), self.level):
+            if self.nframes:
+                # Frames after the first are written as fdAT chunks, which
+                # are IDAT chunks with a sequence number.
+                self.fo.write(_png_chunk(b'fdAT',
+                                         struct.pack('>I', self.seq) + data))
+                self.seq += 1
+            else:
+                self.fo.write(_png_chunk(b'IDAT', data))
+        self.nframes += 1
+
+    def close(self):
+        """Finish the image, writing the final number of frames."""
+
+        self.fo.write(_png_chunk(b'IEND', b''))
+        self.fo.seek(self.actl_pos)
+        self.fo.write(self._actl())
+        self.fo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 # For mathematical details of this algorithm, please see the blog
 # article at https://scipython.com/blog/poisson-disc-sampling-in-python/
@@ -8,106 +7,124 @@ import matplotlib.pyplot as plt
 class PoissonDisc():
     """A class for generating two-dimensional Possion (blue) noise)."""
 
-    def __init__(self, width=50, height=50, r=1, k=30):
+    def __init__(self, width=50, height=50, r=1, k=30, rng=None):
         self.width, self.height = width, height
         self.r = r
         self.k = k
+        self.rng = np.random.default_rng(rng)
 
         # Cell side length
         self.a = r/np.sqrt(2)
         # Number of cells in the x- and y-directions of the grid
         self.nx, self.ny = int(width / self.a) + 1, int(height / self.a) + 1
 
+        # The offsets, in the flattened grid of cells (see reset), of the
+        # cells that could contain points closer than r to a point in the
+        # cell at (0,0), illustrated below.
+        #
+        #                             ooo
+        #                            ooooo
+        #                            ooXoo
+        #                            ooooo
+        #                             ooo
+        #
+        dx, dy = np.mgrid[-2:3, -2:3]
+        offsets = dx * (self.ny + 4) + dy
+        near = abs(dx * dy) < 4
+        self.offsets = offsets[near]
+        # The four orthogonal neighbours, where a close point is most likely
+        # to be found, and the others, excluding the cell itself.
+        distance = abs(dx) + abs(dy)
+        self.orthogonal = offsets[distance == 1]
+        self.others = offsets[near & (distance > 1)]
+
         self.reset()
 
     def reset(self):
-        """Reset the cells dictionary."""
-
-        # A list of coordinates in the grid of cells
-        coords_list = [(ix, iy) for ix in range(self.nx)
-                                for iy in range(self.ny)]
-        # Initilalize the dictionary of cells: each key is a cell's coordinates
-        # the corresponding value is the index of that cell's point's
-        # coordinates in the samples list (or None if the cell is empty).
-        self.cells = {coords: None for coords in coords_list}
+        """Reset the grid of cells and the samples."""
+
+        # Each cell of the grid holds the index of its point in the samples
+        # array, or -1 if the cell is empty; the point's coordinates are
+        # also held in the grids cell_x and cell_y (inf for an empty cell),
+        # so that those of neighbouring cells are close together in memory.
+        # The grids are padded with two rows of empty cells on each side, so
+        # that the neighbours of every cell in the domain lie within them.
+        # No cell can hold more than one point, which bounds the number of
+        # samples.
+        shape = self.nx + 4, self.ny + 4
+        self.cells = np.full(shape, -1, dtype=np.int32)
+        self.cell_x = np.full(shape, np.inf)
+        self.cell_y = np.full(shape, np.inf)
+        self.samples = np.empty((self.nx * self.ny, 2))
+        self.nsamples = 0
 
     def get_cell_coords(self, pt):
-        """Get the coordinates of the cell that pt = (x,y) falls in."""
+        """Get the coordinates of the cells that the points pt fall in.
 
-        return int(pt[0] // self.a), int(pt[1] // self.a)
+        pt is a point (x, y) or an (n, 2) array of points.
 
-    def get_neighbours(self, coords):
-        """Return the indexes of points in cells neighbouring cell at coords.
-        For the cell at coords = (x,y), return the indexes of points in the
-        cells with neighbouring coordinates illustrated below: ie those cells
-        that could contain points closer than r.
+        """
 
-                                     ooo
-                                    ooooo
-                                    ooXoo
-                                    ooooo
-                                     ooo
+        pt = np.asarray(pt)
+        return ((pt[..., 0] // self.a).astype(int),
+                (pt[..., 1] // self.a).astype(int))
+
+    def _flat_cells(self, pts):
+        """Return the indexes of the cells of the points pts in the
+        flattened grids.
 
         """
-        
-        dxdy = [(-1,-2),(0,-2),(1,-2),(-2,-1),(-1,-1),(0,-1),(1,-1),(2,-1),
-                (-2,0),(-1,0),(1,0),(2,0),(-2,1),(-1,1),(0,1),(1,1),(2,1),
-                (-1,2),(0,2),(1,2),(0,0)]
-        neighbours = []
-        for dx, dy in dxdy:
-            neighbour_coords = coords[0] + dx, coords[1] + dy
-            if not (0 <= neighbour_coords[0] < self.nx and
-                    0 <= neighbour_coords[1] < self.ny):
-                # We're off the grid: no neighbours here.
-                continue
-            neighbour_cell = self.cells[neighbour_coords]
-            if neighbour_cell is not None:
-                # This cell is occupied: store the index of the contained point
-                neighbours.append(neighbour_cell)
-        return neighbours
-
-    def point_valid(self, pt):
-        """Is pt a valid point to emit as a sample?
-
-        It must be no closer than r from any other point: check the cells in
-        its immediate neighbourhood.
+
+        # The coordinates are non-negative, so truncation is flooring.
+        i = (pts * (1 / self.a)).astype(np.intp)
+        i += 2
+        return i[:, 0] * (self.ny + 4) + i[:, 1]
+
+    def _add(self, pts, cells):
+        """Add the points pts, in the flattened cells, to the samples."""
+
+        n, m = self.nsamples, len(pts)
+        self.samples[n:n+m] = pts
+        self.cells.ravel()[cells] = n + np.arange(m, dtype=np.int32)
+        self.cell_x.ravel()[cells] = pts[:, 0]
+        self.cell_y.ravel()[cells] = pts[:, 1]
+        self.nsamples += m
+
+    def _close(self, pts, cells, offsets):
+        """Return the mask of neighbours closer than r to the points pts.
+
+        The neighbours are those in the flattened cells at offsets from
+        the points' cells, and the mask is an (n, len(offsets)) array.
 
         """
 
-        cell_coords = self.get_cell_coords(pt)
-        for idx in self.get_neighbours(cell_coords):
-            nearby_pt = self.samples[idx]
-            # Squared distance between candidate point, pt, and this nearby_pt.
-            distance2 = (nearby_pt[0]-pt[0])**2 + (nearby_pt[1]-pt[1])**2
-            if distance2 < self.r**2:
-                # The points are too close, so pt is not a candidate.
-                return False
-        # All points tested: if we're here, pt is valid
-        return True
-    
-    def get_point(self, refpt):
-        """Try to find a candidate point near refpt to emit in the sample.
-
-        We draw up to k points from the annulus of inner radius r, outer radius
-        2r around the reference point, refpt. If none of them are suitable
-        (because they're too close to existing points in the sample), return
-        False. Otherwise, return the pt.
+        i = cells[:, None] + offsets
+        dx = self.cell_x.ravel().take(i)
+        dx -= pts[:, :1]
+        dx *= dx
+        dy = self.cell_y.ravel().take(i)
+        dy -= pts[:, 1:]
+        dy *= dy
+        dx += dy
+        return dx < self.r**2
+
+    def _valid(self, pts, cells):
+        """Return the mask of the points pts (in the flattened cells) which
+        are no closer than r to any of the samples.
+
+        The points' own cells must be empty. The neighbouring cells are
+        checked in two passes, the second only for the points which pass the
+        first.
 
         """
 
-        i = 0
-        while i < self.k:
-            i += 1
-            rho = np.sqrt(np.random.uniform(r**2, 4 * r**2))
-            theta = np.random.uniform(0, 2*np.pi)
-            pt = refpt[0] + rho*np.cos(theta), refpt[1] + rho*np.sin(theta)
-            if not (0 <= pt[0] < self.width and 0 <= pt[1] < self.height):
-                # This point falls outside the domain, so try again.
-                continue
-            if self.point_valid(pt):
-                return pt
-        # We failed to find a suitable point in the vicinity of refpt.
-        return False
+        valid = np.ones(len(pts), dtype=bool)
+        i = np.arange(len(pts))
+        for offsets in (self.orthogonal, self.others):
+            close = self._close(pts[i], cells[i], offsets).any(axis=1)
+            valid[i[close]] = False
+            i = i[~close]
+        return valid
 
     def sample(self):
         """Poisson disc random sampling in 2D.
@@ -117,35 +134,92 @@ class PoissonDisc():
         maximum number of candidate points to be chosen around each reference
         point before removing it from the "active" list.
 
+        The active points are advanced together, in rounds: in each round,
+        every active point draws one candidate from the annulus of radii r
+        and 2r around it, and the candidates far enough from the existing
+        samples are checked against each other, in a random order of
+        priority, before being added. An active point is removed once k of
+        its candidates in a row have failed. The samples are returned as an
+        (n, 2) array.
+
         """
 
-        # Pick a random point to start with.
-        pt = (np.random.uniform(0, self.width),
-              np.random.uniform(0, self.height))
-        self.samples = [pt]
-        # Our first sample is indexed at 0 in the samples list...
-        self.cells[self.get_cell_coords(pt)] = 0
-        # and it is active, in the sense that we're going to look for more
-        # points in its neighbourhood.
-        active = [0]
-
-        # As long as there are points in the active list, keep looking for
-        # samples.
-        while active:
-            # choose a random "reference" point from the active list.
-            idx = np.random.choice(active)
-            refpt = self.samples[idx]
-            # Try to pick a new point relative to the reference point.
-            pt = self.get_point(refpt)
-            if pt:
-                # Point pt is valid: add it to samples list and mark as active
-                self.samples.append(pt)
-                nsamples = len(self.samples) - 1
-                active.append(nsamples)
-                self.cells[self.get_cell_coords(pt)] = nsamples
-            else:
-                # We had to give up looking for valid points near refpt, so
-                # remove it from the list of "active" points.
-                active.remove(idx)
-
-        return self.samples
+        rng, r = self.rng, self.r
+        samples = self.samples
+        cells = self.cells.ravel()
+
+        # Pick a random point to start with: it is active, in the sense
+        # that we're going to look for more points in its neighbourhood.
+        pt = np.array([[rng.uniform(0, self.width),
+                        rng.uniform(0, self.height)]])
+        self._add(pt, self._flat_cells(pt))
+        # The active list is a preallocated array of sample indexes, holding
+        # nactive of them, with the number of consecutive failed candidates
+        # for each.
+        active = np.zeros(len(samples), dtype=np.int32)
+        failures = np.zeros(len(samples), dtype=np.int32)
+        nactive = 1
+
+        while nactive:
+            # One candidate point around each active point.
+            rho = np.sqrt(rng.uniform(r**2, 4 * r**2, nactive))
+            theta = rng.uniform(0, 2*np.pi, nactive)
+            pts = samples[active[:nactive]]
+            pts[:, 0] += rho * np.cos(theta)
+            pts[:, 1] += rho * np.sin(theta)
+            # Drop the candidates outside the domain or in an occupied cell
+            # before checking the rest against their neighbours.
+            j = np.flatnonzero((pts[:, 0] >= 0) & (pts[:, 0] < self.width) &
+                               (pts[:, 1] >= 0) & (pts[:, 1] < self.height))
+            flat = self._flat_cells(pts[j])
+            free = cells[flat] < 0
+            j, flat = j[free], flat[free]
+            valid = self._valid(pts[j], flat)
+            j, flat = j[valid], flat[valid]
+            failed = np.ones(nactive, dtype=bool)
+            failed[j] = False
+
+            # Resolve the conflicts between the valid candidates, in a random
+            # order of priority: only the first in each cell is kept, and
+            # then only those with no closer candidate of higher priority.
+            order = rng.permutation(len(j))
+            j, flat = j[order], flat[order]
+            order = np.argsort(flat, kind='stable')
+            first = np.ones(len(j), dtype=bool)
+            first[1:] = flat[order][1:] != flat[order][:-1]
+            keep = np.sort(order[first])
+            j, flat = j[keep], flat[keep]
+            n = self.nsamples
+            self._add(pts[j], flat)
+            close = self._close(pts[j], flat, self.offsets)
+            neighbours = cells.take(flat[:, None] + self.offsets)
+            conflict = (close & (neighbours >= n) & (neighbours <
+                        n + np.arange(len(j))[:, None])).any(axis=1)
+            # Take the candidates back out and add those with no conflict.
+            cells[flat] = -1
+            self.cell_x.ravel()[flat] = self.cell_y.ravel()[flat] = np.inf
+            self.nsamples = n
+            j, flat = j[~conflict], flat[~conflict]
+            self._add(pts[j], flat)
+
+            # Update the failure counts and add the new points to the active
+            # list.
+            m = len(j)
+            failures[:nactive][failed] += 1
+            failures[j] = 0
+            active[nactive:nactive+m] = n + np.arange(m, dtype=np.int32)
+            failures[nactive:nactive+m] = 0
+            nactive += m
+
+            # Remove the points which have failed k times in a row, by
+            # swapping the last points of the active list into their places.
+            dead = np.flatnonzero(failures[:nactive] >= self.k)
+            nactive -= len(dead)
+            holes = dead[dead < nactive]
+            tail = np.ones(len(dead), dtype=bool)
+            tail[dead[dead >= nactive] - nactive] = False
+            movers = nactive + np.flatnonzero(tail)
+            active[holes] = active[movers]
+            failures[holes] = failures[movers]
+
+        return samples[:self.nsamples]
@@ -0,0 +1,199 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from svg_writer import SVGWriter, format_fixed
+
+# Vectorized construction of whole families of Reuleaux polygons, and frames
+# for animations of them rolling along a line, written as SVG images. See
+# https://scipython.com/blog/constructing-reuleaux-polygons/ for the geometry.
+
+STYLE = """
+path {
+    stroke-width: 4px;
+    stroke: #000;
+    fill: %s;
+}
+line {
+    stroke-width: 2px;
+    stroke: #888;
+}
+"""
+
+def circumradius(n, a):
+    """Return the circumradius of the regular n-gon inscribed in a Reuleaux
+    polygon of width a: the radius of the circle through its vertices."""
+
+    alpha = np.pi * (1 - 1/np.asarray(n))
+    return a / 2 / np.sin(alpha/2)
+
+def vertices(n, a, phi=0, cx=0, cy=0):
+    """Return the vertices of the Reuleaux n-gon of width a as arrays x, y.
+
+    phi, cx and cy may be broadcastable arrays of phases and centres: the
+    returned arrays have their broadcast shape plus a final axis of length
+    n, so the vertices of many polygons are calculated at once. n must be
+    odd.
+
+    """
+
+    phi, cx, cy = (np.asarray(v, dtype=float)[..., None]
+                   for v in (phi, cx, cy))
+    theta = 2 * np.pi * np.arange(n) / n + phi
+    r = circumradius(n, a)
+    return cx + r * np.cos(theta), cy + r * np.sin(theta)
+
+def outline_paths(x, y, a, precision=2):
+    """Return the SVG path data for the Reuleaux polygons with vertices x, y.
+
+    x and y have shape (npolys, n); each polygon's outline is a closed path
+    of n relative arcs of radius a, each ending at the next vertex. The
+    vertices are rounded to precision before the differences are taken, so
+    rounding errors don't accumulate around the polygon.
+
+    """
+
+    scale = 10**precision
+    qx, qy = (np.rint(np.atleast_2d(v) * scale).astype(np.int64)
+              for v in (x, y))
+    sx, sy = (format_fixed(v, precision) for v in (qx[:, 0], qy[:, 0]))
+    dx, dy = (format_fixed(np.roll(v, -1, axis=1) - v, precision)
+              for v in (qx, qy))
+    arc = 'a{0},{0},0,0,1,'.format(format_fixed(round(a * scale), precision))
+    arcs = np.char.add(np.char.add(np.char.add(arc, dx), ','), dy)
+    return ['M{} {}{}z'.format(x0, y0, ''.join(row))
+            for x0, y0, row in zip(sx.tolist(), sy.tolist(), arcs.tolist())]
+
+def rolling_poses(n, a, theta, phi0=np.pi/2):
+    """Return the phase and centre (phi, cx, cy) of a rolling Reuleaux n-gon.
+
+    The polygon, of width a and initial phase phi0, rolls without slipping
+    to the right (turning clockwise) along the line y = 0 (with y pointing
+    up) through the angles theta, starting with its lowest point at x = 0.
+    The polygon's lowest point alternates between one of its vertices (about
+    which it pivots) and a point on the arc centred on the opposite vertex
+    (which rolls a distance a per radian).
+
+    """
+
+    theta = np.asarray(theta, dtype=float)
+    w = np.pi / n
+    r = circumradius(n, a)
+
+    def rolled(phi):
+        """Return the distance rolled (from phase 0) and the lowest point."""
+
+        # The direction straight down as an angle in the polygon's frame, in
+        # units of w: even and odd values of m label the ranges of direction
+        # for which the lowest point is a vertex or on an arc, respectively.
+        t = ((-np.pi/2 - phi) % (2*np.pi)) / w + 0.5
+        m = np.floor(t).astype(int) % (2*n)
+        k = np.where(m % 2, (m + n) // 2, m // 2) % n
+        ang = 2 * np.pi * k / n + phi
+        px, py = r * np.cos(ang), r * np.sin(ang) - a * (m % 2)
+        # Distance rolled: the total angle spent on arcs, times a.
+        s = a * w * (np.floor(t / 2) + np.clip(t % 2 - 1, 0, 1))
+        s = s + a * np.pi * np.floor((-np.pi/2 - phi) / (2*np.pi))
+        return s, px, py
+
+    phi = phi0 - theta
+    s0, _, _ = rolled(np.asarray(phi0, dtype=float))
+    s, px, py = rolled(phi)
+    return phi, s - s0 - px, -py
+
+def _frame_paths(n, a, phi, cx, cy, precision):
+    """Return the outline path data for one chunk of polygons with n sides."""
+
+    return outline_paths(*vertices(n, a, phi, cx, cy), a, precision)
+
+def render_frames(frames, a, filenames, width, height, colour='#888',
+                  ground=None, precision=2, chunksize=64, max_workers=None):
+    """Write SVG images of many Reuleaux polygons, one per file.
+
+    frames is a sequence of (n, phi, cx, cy) tuples in image coordinates.
+    Consecutive frames with the same n are grouped and their outlines
+    calculated as arrays in a pool of worker processes; the images are then
+    written in order by a single buffered SVG writer stage. If ground is
+    given, a horizontal line is drawn at that image y-coordinate.
+
+    """
+
+    # Group consecutive frames by n, in chunks of up to chunksize frames.
+    chunks = []
+    for i, (n, phi, cx, cy) in enumerate(frames):
+        if not n % 2 == 1:
+            raise ValueError('n must be odd, not {}'.format(n))
+        if (chunks and chunks[-1][0] == n
+                and len(chunks[-1][1]) < chunksize):
+            chunks[-1][1].append((phi, cx, cy))
+        else:
+            chunks.append((n, [(phi, cx, cy)]))
+
+    style = STYLE % colour
+    filenames = iter(filenames)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_frame_paths, n, a, *np.array(poses).T,
+                                   precision) for n, poses in chunks]
+        for future in futures:
+            for d in future.result():
+                with SVGWriter(next(filenames), width, height, style=style,
+                               precision=precision) as svg:
+                    if ground is not None:
+                        svg.line(0, ground, width, ground)
+                    svg.path(d)
+
+def family(ns, a, phis=(0,), size=600, colour='#888',
+           filename_template='reuleaux-{n}-{i:03d}.svg', **kwargs):
+    """Write SVG images of the Reuleaux n-gon for each n in ns and phi in phis.
+
+    The polygons, of width a, are centred in an image of size x size pixels,
+    and the files are named by filename_template from n and the index, i, of
+    the phase.
+
+    """
+
+    c = size / 2
+    frames = [(n, phi, c, c) for n in ns for phi in phis]
+    filenames = [filename_template.format(n=n, i=i) for n in ns
+                 for i in range(len(phis))]
+    render_frames(frames, a, filenames, size, size, colour, **kwargs)
+
+def rolling_animation(n, a, nframes, revolutions=1, colour='#888',
+                      filename_template='reuleaux-roll-{n}-{i:04d}.svg',
+                      **kwargs):
+    """Write the SVG frames of a Reuleaux n-gon rolling along a line.
+
+    The polygon, of width a, turns through the given number of revolutions
+    over nframes frames and, since its perimeter is pi.a, travels a distance
+    pi.a per revolution.
+
+    """
+
+    theta = np.linspace(0, 2 * np.pi * revolutions, nframes)
+    phi, cx, cy = rolling_poses(n, a, theta)
+    pad = a / 4
+    width = int(np.pi * a * revolutions + 2 * a + 2 * pad)
+    height = int(a + 2 * pad)
+    ground = a + pad
+    # Image coordinates have y pointing down, so reflect the poses.
+    frames = [(n, -p, x + a + pad, ground - y) for p, x, y in zip(phi, cx, cy)]
+    filenames = [filename_template.format(n=n, i=i) for i in range(nframes)]
+    render_frames(frames, a, filenames, width, height, colour, ground=ground,
+                  **kwargs)
+
+if __name__ == '__main__':
+    # Either the family of odd n-gons up to nmax in nphases phases
+    #   python reuleaux.py family nmax nphases
+    # or the frames of a rolling n-gon animation
+    #   python reuleaux.py roll n nframes
+    mode, v1, v2 = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+    if mode == 'family':
+        family(range(3, v1 + 1, 2), 175,
+               np.linspace(0, 2 * np.pi, v2, endpoint=False))
+    elif mode == 'roll':
+        rolling_animation(v1, 175, v2)
+    else:
+        sys.exit('Unknown mode: {}'.format(mode))
@@ -0,0 +1,234 @@
+import gzip
+import numpy as np
+
+# A small, buffered SVG writer shared by the projects in this repository
+# which create SVG images (the mazes and Reuleaux polygons). Output is
+# collected in memory and written in large blocks, many line segments can be
+# batched into a single <path> element using compact relative commands at a
+# fixed precision, and files ending in .svgz are written gzip-compressed.
+
+def fmt(x, precision=2):
+    """Return a compact string representation of x to precision decimals."""
+
+    s = '{:.{}f}'.format(x, precision)
+    if '.' in s:
+        s = s.rstrip('0').rstrip('.')
+    return '0' if s == '-0' else s
+
+def _fixed(q, precision):
+    """Format the integer q, in units of 10^-precision, as a decimal."""
+
+    if not precision:
+        return str(q)
+    s = '{}{}.{:0{}d}'.format('-' if q < 0 else '', abs(q) // 10**precision,
+                               abs(q) % 10**precision, precision)
+    return s.rstrip('0').rstrip('.')
+
+def format_fixed(q, precision):
+    """Format the integer array q, in units of 10^-precision, as decimals.
+
+    Trailing zeros (and decimal points) are dropped, so, for example, with
+    precision=2 the values 150, -5 and 300 become '1.5', '-0.05' and '3'.
+    Each distinct value is only formatted once.
+
+    """
+
+    u, inv = np.unique(np.asarray(q, dtype=np.int64), return_inverse=True)
+    return np.array([_fixed(v, precision) for v in u.tolist()])[inv]
+
+def _pair_tokens(a, b, token):
+    """Return the list of strings token(a[i], b[i]) for integer arrays a, b.
+
+    In path data, many (a, b) pairs are repeated, so each distinct pair is
+    only formatted once.
+
+    """
+
+    ua, ia = np.unique(a, return_inverse=True)
+    ub, ib = np.unique(b, return_inverse=True)
+    keys, inv = np.unique(ia.astype(np.int64) * len(ub) + ib,
+                          return_inverse=True)
+    ua, ub = ua.tolist(), ub.tolist()
+    tokens = np.array([token(ua[k // len(ub)], ub[k % len(ub)])
+                       for k in keys.tolist()] or [''], dtype=object)
+    return tokens[inv].tolist()
+
+def segments_path(x1, y1, x2, y2, precision=2):
+    """Return SVG path data drawing the line segments (x1,y1)-(x2,y2).
+
+    The coordinates are arrays. Each segment is drawn with a relative move
+    from the end of the previous one (omitted if they coincide) followed by a
+    relative line, using the shorter h and v commands for horizontal and
+    vertical segments. Since the coordinates are rounded to precision before
+    taking differences, the rounding errors do not accumulate along the path.
+
+    """
+
+    scale = 10**precision
+    x1, y1, x2, y2 = (np.rint(np.asarray(c, dtype=float) * scale)
+                      .astype(np.int64) for c in (x1, y1, x2, y2))
+    if not len(x1):
+        return ''
+    # Moves relative to the end of the previous segment (the first is
+    # written separately, as an absolute move).
+    mx = x1 - np.concatenate(([x1[0]], x2[:-1]))
+    my = y1 - np.concatenate(([y1[0]], y2[:-1]))
+
+    def move(mx, my):
+        # No move is needed where a segment starts at the end of the last.
+        if mx == my == 0:
+            return ''
+        return 'm{} {}'.format(_fixed(mx, precision), _fixed(my, precision))
+
+    def line(dx, dy):
+        if dy == 0:
+            return 'h' + _fixed(dx, precision)
+        if dx == 0:
+            return 'v' + _fixed(dy, precision)
+        return 'l{} {}'.format(_fixed(dx, precision), _fixed(dy, precision))
+
+    d = [None] * (2 * len(x1))
+    d[0::2] = _pair_tokens(mx, my, move)
+    d[1::2] = _pair_tokens(x2 - x1, y2 - y1, line)
+    return 'M{} {}'.format(_fixed(x1[0], precision),
+                           _fixed(y1[0], precision)) + ''.join(d)
+
+def polyline_path(x, y, precision=2):
+    """Return SVG path data for the polyline through the points (x, y)."""
+
+    scale = 10**precision
+    x, y = (np.rint(np.asarray(c, dtype=float) * scale).astype(np.int64)
+            for c in (x, y))
+    if not len(x):
+        return ''
+
+    def line(dx, dy):
+        return 'l{} {}'.format(_fixed(dx, precision), _fixed(dy, precision))
+
+    return 'M{} {}'.format(_fixed(x[0], precision), _fixed(y[0], precision)
+                           ) + ''.join(_pair_tokens(np.diff(x), np.diff(y),
+                                                    line))
+
+class SVGWriter:
+    """A buffered writer for an SVG image file.
+
+    Use as a context manager:
+
+        with SVGWriter('image.svg', 600, 600) as svg:
+            svg.circle(300, 300, 50, cls='marker')
+
+    The SVG preamble is written on creation and the closing tag by close().
+    If filename ends in '.svgz', the file is gzip-compressed at the given
+    level (as for zlib: 1 is fastest, 9 gives the smallest files).
+
+    """
+
+    def __init__(self, filename, width, height, view_box=None, style=None,
+                 precision=2, bufsize=2**20, level=6):
+        """Open filename and write the SVG preamble.
+
+        width and height give the image size in pixels; view_box, if given, is
+        a sequence (min-x, min-y, width, height). style is an optional CSS
+        stylesheet. Numbers are written with at most precision decimals and
+        output is buffered in chunks of about bufsize characters; level is
+        the compression level for .svgz files.
+
+        """
+
+        self.precision = precision
+        self.bufsize = bufsize
+        if filename.endswith('.svgz'):
+            self.fo = gzip.open(filename, 'wt', compresslevel=level,
+                                encoding='utf-8')
+        else:
+            self.fo = open(filename, 'w', encoding='utf-8')
+        self._buf, self._buflen = [], 0
+
+        self.write('<?xml version="1.0" encoding="utf-8"?>\n'
+                   '<svg xmlns="http://www.w3.org/2000/svg"\n'
+                   '    xmlns:xlink="http://www.w3.org/1999/xlink"\n'
+                   '    width="{}" height="{}"'.format(width, height))
+        if view_box is not None:
+            self.write(' viewBox="{}"'.format(
+                        ' '.join(self.fmt(v) for v in view_box)))
+        self.write('>\n')
+        if style:
+            self.write('<defs>\n<style type="text/css"><![CDATA[\n{}\n'
+                       ']]></style>\n</defs>\n'.format(style))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def fmt(self, x):
+        """Format the number x at this writer's precision."""
+
+        return fmt(x, self.precision)
+
+    def write(self, s):
+        """Write the string s to the (buffered) output."""
+
+        self._buf.append(s)
+        self._buflen += len(s)
+        if self._buflen >= self.bufsize:
+            self.flush()
+
+    def flush(self):
+        """Write any buffered output to the file."""
+
+        self.fo.write(''.join(self._buf))
+        self._buf, self._buflen = [], 0
+
+    def close(self):
+        """Write the closing tag, flush the buffer and close the file."""
+
+        self.write('</svg>\n')
+        self.flush()
+        self.fo.close()
+
+    def _attrs(self, attrs):
+        """Return the string of SVG attributes from the dictionary attrs.
+
+        Numeric values are formatted at the writer's precision; the keyword
+        cls is written as class and underscores in keywords become hyphens.
+
+        """
+
+        s = []
+        for k, v in attrs.items():
+            k = 'class' if k == 'cls' else k.replace('_', '-')
+            if isinstance(v, (int, float, np.number)):
+                v = self.fmt(v)
+            s.append(' {}="{}"'.format(k, v))
+        return ''.join(s)
+
+    def element(self, tag, **attrs):
+        """Write an empty element <tag ... /> with the given attributes."""
+
+        self.write('<{}{}/>\n'.format(tag, self._attrs(attrs)))
+
+    def circle(self, cx, cy, r, **attrs):
+        self.element('circle', cx=cx, cy=cy, r=r, **attrs)
+
+    def rect(self, x, y, width, height, **attrs):
+        self.element('rect', x=x, y=y, width=width, height=height, **attrs)
+
+    def line(self, x1, y1, x2, y2, **attrs):
+        self.element('line', x1=x1, y1=y1, x2=x2, y2=y2, **attrs)
+
+    def path(self, d, **attrs):
+        """Write a <path> element with path data d."""
+
+        self.element('path', d=d, **attrs)
+
+    def segments(self, x1, y1, x2, y2, **attrs):
+        """Write the line segments (x1,y1)-(x2,y2) as a single <path>."""
+
+        self.path(segments_path(x1, y1, x2, y2, self.precision), **attrs)
+
+    def polyline(self, x, y, **attrs):
+        """Write the polyline through the points (x, y) as a <path>."""
+
+        self.path(polyline_path(x, y, self.precision), **attrs)